@@ -5,7 +5,8 @@ import keypirinha_net as kpnet
 
 import os
 import re
-from glob import glob
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError, as_completed, wait
 
 from .lib.steam import Steam
 from .lib.egs import EGS
@@ -13,12 +14,15 @@ from .lib.origin import Origin
 from .lib.gog import GOG
 from .lib.uplay import UPlay
 from .lib.windowsstore import WindowsStore
-from .lib.util import RepoContext
+from .lib.util import CatalogSnapshot, DirectoryWatcher, IconCache, RebuildScheduler, RepoContext, launch
 
 
 class AllMyGames(kp.Plugin):
 
     CATEGORY = kp.ItemCategory.USER_BASE + 1
+    ITEM_PARAMETERS = set(['category', 'label', 'target', 'short_desc', 'args_hint', 'hit_hint'])
+    # seconds without further triggers before a rebuild starts
+    REBUILD_DELAY = 1.0
 
     """
     Add games from multiple game repositories to the catalog.
@@ -34,17 +38,144 @@ class AllMyGames(kp.Plugin):
             "args_hint": kp.ItemArgsHint.ACCEPTED,
             "hit_hint": kp.ItemHitHint.KEEPALL,
         }
+        # the current generation of repos (and their fingerprints). These dicts are never modified,
+        # updates build new ones and swap them in, so they can be read without locking
         self.__repos = {}
+        self.__fingerprints = {}
+        self.__store_order = []
+        # store -> number of the last update started for it
+        self.__generations = {}
+        # store -> future of the last scan started for it
+        self.__scans = {}
+        self.__watcher = None
+        self.__watcher_interval = 0
+        self.__scheduler = RebuildScheduler(self.__rebuild, AllMyGames.REBUILD_DELAY, "AllMyGames-rebuild")
+        # launches may have to wait for a launcher to start up, that shouldn't block keypirinha.
+        # Each required program gets its own queue so waiting for one doesn't hold up launches
+        # that don't need it: required process (None for no requirement) -> executor
+        self.__launchers = {}
+        self.__lock = threading.Lock()
+        self.__snapshot_loaded = False
+        self.__publish_lock = threading.Lock()
+        # data_bag -> (inputs, entry, catalog item) of the current catalog
+        self.__items = {}
+        # the entries of the catalog last published and last saved as snapshot
+        self.__catalog_entries = None
+        self.__saved_snapshot = None
+        # data_bag -> launch record of every item in the catalog
+        self.__launches = {}
+        # store -> catalog entries from the snapshot and data_bag -> launch record from the snapshot.
+        # They stay in the catalog until the store has loaded for the first time
+        self.__snapshot_entries = {}
+        self.__snapshot_launches = {}
+        self.__icon_cache = None
+        # icon path -> icon handle, shared by all items using the icon
+        self.__icon_handles = {}
+        # icons are resolved in the background after the catalog was published:
+        # data_bag -> resolved icon path, icons from the snapshot used until then and the items
+        # waiting to be resolved
+        self.__icon_paths = {}
+        self.__snapshot_icons = {}
+        self.__icons_queued = set()
+        # items whose icon couldn't be read, they are tried again the next time their store is scanned
+        self.__icon_failures = set()
+        self.__icon_resolver = ThreadPoolExecutor(max_workers=1, thread_name_prefix="AllMyGames-icons")
         self._debug = False
 
     def on_start(self):
         self.__settings = self.load_settings()
+        self.__setup_watcher()
 
     def on_event(self, flags: int):
         if flags & kp.Events.PACKCONFIG:
             self.__settings = self.load_settings()
+            self.__setup_watcher()
+            self.__scheduler.trigger()
+
+    def __setup_watcher(self):
+        """
+        (re-)start watching the directories the stores read their games from, so that installing
+        or uninstalling a game updates the catalog without waiting for the next full refresh
+        """
+        interval = self.__settings.get_int("watch_interval", "main", 10, min=0)
+        if self.__watcher is not None:
+            if interval == self.__watcher_interval:
+                return
+            self.__watcher.stop()
+            self.__watcher = None
+
+        self.__watcher_interval = interval
+        if interval == 0:
+            return
+
+        self.__watcher = DirectoryWatcher(self.__on_stores_changed, interval)
+        for name, repo in self.__repos.items():
+            self.__watch_repo(name, repo)
+        self.__watcher.start()
+
+    def __watch_repo(self, name: str, repo):
+        watcher = self.__watcher
+        if watcher is None:
+            return
+        try:
+            watcher.watch(name, repo.watch_paths, repo.watch_extension)
+        except Exception as e:
+            self.warn("failed to watch store", name, e)
+
+    def __on_stores_changed(self, names: list):
+        self.info("Store content changed", names)
+        self.__scheduler.trigger(names)
+
+    def request_update(self, names: list):
+        """
+        schedule the specified stores to be scanned again
+        """
+        self.__scheduler.trigger(names)
 
     def on_catalog(self):
+        # on the first update after startup we publish the catalog from last time immediately,
+        # the actual update always happens in the background
+        if not self.__snapshot_loaded:
+            self.__snapshot_loaded = True
+            self.__publish_snapshot()
+
+        self.__scheduler.trigger()
+
+    def __rebuild(self, stores: set):
+        try:
+            self.__update_catalog(None if stores is None else sorted(stores))
+        except Exception:
+            self.err("Failed to update catalog", traceback.format_exc())
+
+    def __publish_snapshot(self):
+        try:
+            snapshot = CatalogSnapshot(self.get_package_cache_path(create=True)).load()
+        except Exception as e:
+            self.warn("Failed to load catalog snapshot", e)
+            return False
+
+        if snapshot is None:
+            return False
+
+        entries, launches = snapshot
+        snapshot_entries = {}
+        for entry in entries:
+            snapshot_entries.setdefault(entry["data_bag"].split("|", 1)[0], []).append(entry)
+
+        self.info("Publishing catalog from last time", len(entries))
+        with self.__publish_lock:
+            with self.__lock:
+                self.__snapshot_entries = snapshot_entries
+            self.__snapshot_launches = launches
+            self.__launches = launches
+            self.__snapshot_icons = {entry["data_bag"]: entry["icon"] for entry in entries}
+            self.__items = {entry["data_bag"]: (None, entry, self.create_catalog_item(entry)) for entry in entries}
+            self.__catalog_entries = entries
+            self.__saved_snapshot = (entries, launches)
+            self.set_catalog([item for inputs, entry, item in self.__items.values()])
+        return True
+
+    def __update_catalog(self, only: list = None):
         available_stores = [
             ("Steam", Steam),
             ("Epic Games Store", EGS),
@@ -56,41 +187,351 @@ class AllMyGames(kp.Plugin):
         # TODO: bethesda.net, rockstar launcher, battle.net
 
         stores = []
+        disabled = []
         for store in available_stores:
-            if self.__settings.get_bool("enabled", store[0], True):
+            if not self.__settings.get_bool("enabled", store[0], True):
+                disabled.append(store[0])
+            elif only is None or store[0] in only:
                 stores.append(store)
 
-        for candidate in stores:
-            name, clazz = candidate
+        with self.__lock:
+            # forget about stores that got disabled
+            self.__repos = {name: repo for name, repo in self.__repos.items() if name not in disabled}
+            self.__fingerprints = {name: fp for name, fp in self.__fingerprints.items() if name not in disabled}
+            self.__snapshot_entries = {name: entries for name, entries in self.__snapshot_entries.items()
+                                       if name not in disabled}
+
+            # every store counts its updates separately so that rescanning one store doesn't
+            # discard results still pending for the others
+            generations = {}
+            for name, clazz in stores:
+                generations[name] = self.__generations.get(name, 0) + 1
+            self.__generations.update(generations)
+            self.__store_order = [name for name, clazz in available_stores]
+
+        # the stores are independent of each other so we scan them all at the same time.
+        # Once the budget is used up, the catalog is published with the stores that are done,
+        # the others get added when they finish.
+        # A store that takes too long (e.g. because it's trying to access a network drive that
+        # isn't available) is skipped so it doesn't hold up the entire catalog
+        timeout = self.__settings.get_int("store_timeout", "main", 30, min=1)
+        budget = min(timeout, self.__settings.get_int("store_budget", "main", 5, min=0))
+        # the icon cache directory is listed once per update, not once per item
+        self.__get_icon_cache().refresh()
+        with self.__publish_lock:
+            names = set(name for name, clazz in stores)
+            self.__icon_failures = set(data_bag for data_bag in self.__icon_failures
+                                       if data_bag.split("|", 1)[0] not in names)
+
+        executor = ThreadPoolExecutor(max_workers=max(1, len(stores)), thread_name_prefix="AllMyGames")
+        futures = []
+        for name, clazz in stores:
+            # a store that still hasn't finished its previous scan (e.g. because it hangs on a network
+            # drive) isn't scanned again, we keep waiting for the scan in progress instead of leaving
+            # yet another thread stuck
+            future = self.__scans.get(name)
+            if future is None or future.done():
+                future = executor.submit(self.__make_repo, name, clazz)
+                self.__scans[name] = future
+            else:
+                self.dbg("store still busy with previous scan", name)
+            futures.append((name, future))
+        wait([future for name, future in futures], timeout=budget)
+        executor.shutdown(wait=False)
+        watcher = self.__watcher
+        if watcher is not None:
+            for name in disabled:
+                watcher.unwatch(name)
+
+        pending = [(name, future) for name, future in futures if not future.done()]
+        self.__collect_repos(generations, [(name, future) for name, future in futures if future.done()])
+        self.__publish_catalog(len(pending) == 0)
+
+        if len(pending) > 0:
+            self.info("Catalog published without slow stores, they get added when ready", [name for name, future in pending])
+            # this keeps the rebuild worker busy so the next rebuild doesn't start before this one is done
+            self.__complete_catalog(generations, pending, timeout - budget)
+
+    def __complete_catalog(self, generations: dict, pending: list, timeout: float):
+        names = {future: name for name, future in pending}
+        remaining = len(pending)
+        try:
+            for future in as_completed(names.keys(), timeout=timeout):
+                remaining -= 1
+                self.__collect_repos(generations, [(names[future], future)])
+                self.__publish_catalog(remaining == 0)
+        except FuturesTimeoutError:
+            self.__collect_repos(generations, [(name, future) for name, future in pending if not future.done()])
+            self.__publish_catalog(True)
+
+    def __collect_repos(self, generations: dict, futures: list):
+        results = []
+        finished = set()
+        for name, future in futures:
+            if not future.done():
+                self.warn("store took too long, skipped", name)
+                continue
+            finished.add(name)
             try:
-                self.__repos[name] = clazz(RepoContext(self, name), {k: self.__settings.get(k, name) for k in self.__settings.keys(name)})
+                repo, fingerprint = future.result()
             except Exception as e:
                 # probably just not installed
                 self.warn("failed to initialize repo", name, traceback.format_exc())
+                continue
+            results.append((name, repo, fingerprint))
+
+        with self.__lock:
+            # once a store has loaded (or failed to), its entries from the snapshot are obsolete
+            if any(name in self.__snapshot_entries for name in finished):
+                self.__snapshot_entries = {name: entries for name, entries in self.__snapshot_entries.items()
+                                           if name not in finished}
+
+        if len(results) == 0:
+            return
+
+        with self.__lock:
+            # don't overwrite results of a newer update of the same store
+            results = [result for result in results if generations[result[0]] == self.__generations.get(result[0])]
+            # the new generation is built on the side and then swapped in as a whole so launches
+            # never see a partially updated state and never have to wait for an update
+            repos = dict(self.__repos)
+            fingerprints = dict(self.__fingerprints)
+            for name, repo, fingerprint in results:
+                repos[name] = repo
+                fingerprints[name] = fingerprint
+            self.__repos = repos
+            self.__fingerprints = fingerprints
+
+        for name, repo, fingerprint in results:
+            self.__watch_repo(name, repo)
+
+    def __publish_catalog(self, complete: bool):
+        with self.__publish_lock:
+            # the repos are added to the catalog in the order of the stores so the catalog is stable,
+            # no matter which one finished first
+            with self.__lock:
+                current = self.__repos
+                snapshot_entries = self.__snapshot_entries
+            repos = [(name, current[name]) for name in self.__store_order if name in current]
 
-        self.info("Games found", ["{}: {}".format(repo, len(self.__repos[repo].items)) for repo in self.__repos.keys()])
+            self.info("Games found", ["{}: {}".format(name, len(repo.items)) for name, repo in repos])
 
-        catalog = []
+            # catalog items are only created for entries that changed since the last time,
+            # everything else is reused
+            previous = self.__items
+            items = {}
+            launches = {}
+            pending = []
+            for name in self.__store_order:
+                repo = current.get(name)
+                if repo is None:
+                    # stores that haven't loaded yet keep their entries from the snapshot
+                    for entry in snapshot_entries.get(name, []):
+                        data_bag = entry["data_bag"]
+                        cached = previous.get(data_bag)
+                        if cached is not None and cached[1] == entry:
+                            items[data_bag] = cached
+                        else:
+                            items[data_bag] = (None, entry, self.create_catalog_item(entry))
+                        if data_bag in self.__snapshot_launches:
+                            launches[data_bag] = self.__snapshot_launches[data_bag]
+                    continue
 
-        # update the repo-specific data with static and cached data
-        for repo in self.__repos.keys():
-            catalog.extend(self.make_item(repo, iter) for iter in self.__repos[repo].items)
+                for repo_item in repo.items:
+                    data_bag = name + "|" + repo_item["target"]
+                    # finding icons can be slow, so items whose icon isn't known yet are published with
+                    # a placeholder and their icons get resolved in the background
+                    icon, final = self.__known_icon(name, data_bag, repo_item)
+                    if not final and data_bag not in self.__icons_queued:
+                        pending.append((data_bag, name, repo, repo_item))
+                        self.__icons_queued.add(data_bag)
+                    inputs = self.__item_inputs(name, repo_item, icon)
+                    try:
+                        launches[data_bag] = repo.launch_record(repo_item["target"])
+                    except Exception as e:
+                        self.warn("Failed to determine how to launch", data_bag, e)
+                    cached = previous.get(data_bag)
+                    if cached is not None and cached[0] == inputs:
+                        items[data_bag] = cached
+                    else:
+                        entry = self.make_entry(name, repo_item, icon)
+                        # e.g. items restored from the snapshot only know their entry
+                        if cached is not None and cached[1] == entry:
+                            items[data_bag] = (inputs, entry, cached[2])
+                        else:
+                            items[data_bag] = (inputs, entry, self.create_catalog_item(entry))
+            self.__items = items
+            self.__launches = launches
+            self.__icon_paths = {data_bag: icon for data_bag, icon in self.__icon_paths.items() if data_bag in items}
+            # stores that aren't part of this catalog (yet) may still need their icons from the snapshot
+            self.__snapshot_icons = {data_bag: icon for data_bag, icon in self.__snapshot_icons.items()
+                                     if data_bag in items or data_bag.split("|", 1)[0] not in current}
+            # handles of icons that are no longer used are released
+            used_icons = set(entry["icon"] for inputs, entry, item in items.values())
+            self.__icon_handles = {icon: handle for icon, handle in self.__icon_handles.items() if icon in used_icons}
 
-        self.set_catalog(catalog)
+            catalog_entries = [entry for inputs, entry, item in items.values()]
+            if catalog_entries == self.__catalog_entries:
+                self.dbg("Catalog unchanged")
+            else:
+                self.set_catalog([item for inputs, entry, item in items.values()])
+                self.__catalog_entries = catalog_entries
+
+            # only a complete catalog is kept for the next start
+            snapshot = (catalog_entries, launches)
+            if complete and snapshot != self.__saved_snapshot:
+                try:
+                    CatalogSnapshot(self.get_package_cache_path(create=True)).save(catalog_entries, launches)
+                    self.__saved_snapshot = snapshot
+                except Exception as e:
+                    self.warn("Failed to save catalog snapshot", e)
+
+                self.__collect_icons(repos, items)
+
+            if len(pending) > 0:
+                self.__icon_resolver.submit(self.__resolve_icons, pending, complete)
+
+    def __known_icon(self, name: str, data_bag: str, item: dict):
+        """
+        the icon of an item, as far as it can be determined without fetching it from the store.
+        Returns the icon path (or None) and whether that is the final icon
+        """
+        if data_bag in self.__icon_paths:
+            return self.__icon_paths[data_bag], True
+
+        if data_bag in self.__icon_failures:
+            # don't retry before the store gets scanned again
+            return self.__snapshot_icons.get(data_bag), True
+
+        icon_cache = self.__get_icon_cache()
+        cached = icon_cache.lookup(AllMyGames.icon_stem(name, item["target"]))
+        if cached is not None:
+            return icon_cache.url(cached), True
+
+        # the icon from last time is good enough until the actual one is known
+        return self.__snapshot_icons.get(data_bag), False
+
+    def __resolve_icons(self, pending: list, complete: bool):
+        """
+        fetch the icons of the pending items and publish the catalog again with them
+        """
+        resolved = {}
+        failed = set()
+        try:
+            for data_bag, name, repo, item in pending:
+                try:
+                    resolved[data_bag] = self.get_icon_path(name, repo, item)
+                except:
+                    # maybe just temporarily (e.g. drive not mounted or file locked)
+                    self.warn("Failed to read icon for {}:{}".format(name, item["target"]))
+                    failed.add(data_bag)
+
+            with self.__publish_lock:
+                self.__icon_paths.update(resolved)
+                self.__icon_failures.update(failed)
+
+            self.dbg("Icons resolved", len(resolved))
+            self.__publish_catalog(complete)
+        except Exception:
+            self.err("Failed to resolve icons", traceback.format_exc())
+        finally:
+            with self.__publish_lock:
+                self.__icons_queued.difference_update(data_bag for data_bag, name, repo, item in pending)
+
+    def __collect_icons(self, repos: list, items: dict):
+        """
+        remove icons from the cache that aren't used by the catalog any more and limit the size of
+        the cache. Only icons of stores that are part of the catalog are removed, a store that failed
+        to load this time may still need its icons
+        """
+        icon_cache = self.__get_icon_cache()
+        referenced = set(self.icon_stem(*data_bag.split("|", 1)) for data_bag in items.keys())
+        in_use = set(icon_cache.file_name(entry["icon"]) for inputs, entry, item in items.values())
+        max_size = self.__settings.get_int("icon_cache_size", "main", 50, min=0) * 1024 * 1024
+        try:
+            removed = icon_cache.collect(referenced, [name for name, repo in repos], max_size, in_use)
+        except Exception as e:
+            self.warn("Failed to clean up icon cache", e)
+            return
+
+        if len(removed) > 0:
+            self.dbg("Icons removed from cache", len(removed))
+            # resolved icons pointing to removed files have to be resolved again
+            self.__icon_paths = {data_bag: icon for data_bag, icon in self.__icon_paths.items()
+                                 if icon_cache.file_name(icon) not in removed}
+            self.__snapshot_icons = {data_bag: icon for data_bag, icon in self.__snapshot_icons.items()
+                                     if icon_cache.file_name(icon) not in removed}
+
+    def __item_inputs(self, repo: str, item: dict, icon: str):
+        """
+        everything the catalog item for a repo item depends on
+        """
+        return (
+            repo,
+            {k: v for k, v in item.items() if k in AllMyGames.ITEM_PARAMETERS},
+            self.__settings.get("prefix", "main", "AMG"),
+            self.__settings.get_bool("store_prefix", "main", True),
+            icon,
+        )
+
+    def __make_repo(self, name: str, clazz):
+        context = RepoContext(self, name)
+        settings = {k: self.__settings.get(k, name) for k in self.__settings.keys(name)}
+
+        # if nothing changed in the store since the last update we can keep using the same repo
+        fingerprint = None
+        try:
+            fingerprint = {"settings": settings, "sources": clazz.fingerprint(context, settings)}
+        except Exception as e:
+            self.dbg("failed to determine fingerprint", name, e)
+
+        with self.__lock:
+            previous = self.__repos.get(name)
+            previous_fingerprint = self.__fingerprints.get(name)
+
+        if fingerprint is not None and previous is not None and fingerprint == previous_fingerprint:
+            self.dbg("store unchanged", name)
+            return previous, fingerprint
+
+        return clazz(context, settings), fingerprint
 
     def on_execute(self, item, action):
         self.dbg("execute {}".format(item.data_bag()))
-        repo, target = item.data_bag().split('|', 1)
-        self.__repos[repo].run(kpu, target, item.raw_args())
+        name, target = item.data_bag().split('|', 1)
+        # items are launched from the launch table so that doesn't depend on the store being loaded,
+        # e.g. right after startup when the catalog was published from the snapshot
+        record = self.__launches.get(item.data_bag())
+        if record is None:
+            repo = self.__repos.get(name)
+            if repo is None:
+                self.warn("Store not ready yet", name)
+                return
+            record = repo.launch_record(target)
+
+        self.__get_launcher(record).submit(self.__launch, item.data_bag(), record, item.raw_args())
 
-    def make_item(self, repo: str, item: dict):
+    def __get_launcher(self, record: dict):
+        requires = record["requires"]
+        key = None if requires is None else requires["process"].lower()
+        with self.__lock:
+            launcher = self.__launchers.get(key)
+            if launcher is None:
+                launcher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="AllMyGames-launch")
+                self.__launchers[key] = launcher
+            return launcher
+
+    def __launch(self, data_bag: str, record: dict, call_args: str):
         try:
-            icon_handle = self.get_icon(repo, item)
-        except:
-            self.warn("Failed to read icon for {}:{}", repo, item["target"])
-            icon_handle = None
-        valid_parameters = set(['category', 'label', 'target', 'short_desc', 'args_hint', 'hit_hint'])
-        item = {k: v for k, v in item.items() if k in valid_parameters}
+            launch(kpu, record, call_args, self)
+        except Exception:
+            self.err("Failed to launch", data_bag, traceback.format_exc())
+
+    def make_entry(self, name: str, item: dict, icon: str):
+        """
+        make the catalog entry for an item returned by the repo. The entry contains everything
+        required to create the catalog item and can be serialized
+        """
+        item = {k: v for k, v in item.items() if k in AllMyGames.ITEM_PARAMETERS}
 
         prefix = self.__settings.get("prefix", "main", "AMG")
         store_prefix = self.__settings.get_bool("store_prefix", "main", True)
@@ -104,22 +545,47 @@ class AllMyGames(kp.Plugin):
 
         item = {
             **self.__item_base,
-            "short_desc": "Launch via {0}".format(repo),
+            "short_desc": "Launch via {0}".format(name),
             **item,
-            "label": fmt.format(store=repo, name=item["label"]),
-            "data_bag": repo + "|" + item["target"],
-            "icon_handle": icon_handle,
+            "label": fmt.format(store=name, name=item["label"]),
+            "data_bag": name + "|" + item["target"],
+            "icon": icon,
         }
-        return self.create_item(**item)
+        return item
+
+    def create_catalog_item(self, entry: dict):
+        # many items share the same icon (e.g. all origin games use the icon of the client),
+        # each icon is only loaded once
+        icon_handle = self.__icon_handles.get(entry["icon"])
+        if icon_handle is None and entry["icon"] is not None:
+            try:
+                icon_handle = self.load_icon(entry["icon"])
+                self.__icon_handles[entry["icon"]] = icon_handle
+            except:
+                self.warn("Failed to load icon", entry["icon"])
+        return self.create_item(**{k: v for k, v in entry.items() if k != "icon"}, icon_handle=icon_handle)
 
-    def get_icon(self, repo: str, item: dict):
-        cache_path = self.get_package_cache_path(create=True)
-        target = re.sub(r"[<>:\"/\\|?*]", "_", item["target"])
-        cache_icon_path: str = os.path.join(cache_path, "{repo}_{target}".format(repo=repo, target=target))
+    def __get_icon_cache(self):
+        if self.__icon_cache is None:
+            self.__icon_cache = IconCache(self.get_package_cache_path(create=True), self.package_full_name())
+        return self.__icon_cache
 
-        cached = glob(cache_icon_path + ".*")
-        if len(cached) > 0:
-            cache_icon_path =  "cache://{}/{}".format(self.package_full_name(), os.path.basename(cached[0]))
+    @staticmethod
+    def icon_stem(name: str, target: str):
+        """
+        the name an item's icon is cached under
+        """
+        target = re.sub(r"[<>:\"/\\|?*]", "_", target)
+        return "{repo}_{target}".format(repo=name, target=target)
+
+    def get_icon_path(self, name: str, repo, item: dict):
+        icon_cache = self.__get_icon_cache()
+        stem = AllMyGames.icon_stem(name, item["target"])
+        cache_icon_path: str = os.path.join(icon_cache.path, stem)
+
+        cached = icon_cache.lookup(stem)
+        if cached is not None:
+            cache_icon_path = icon_cache.url(cached)
         else:
             # if the icon has to be downloaded or is otherwise expensive to generate, the game script
             # can use the cache_icon_path parameter as the basis for the cache file
@@ -130,23 +596,19 @@ class AllMyGames(kp.Plugin):
             # - a regular file path
             # in the latter case we do the caching ourselves because load_icon doesn't support loading
             # files directly
-            updated_path = self.__repos[repo].fetch_icon(item, cache_icon_path)
+            updated_path = repo.fetch_icon(item, cache_icon_path)
 
-            if updated_path.startswith("cache://") or\
-                updated_path.startswith("@"):
+            if updated_path.startswith("cache://"):
+                cache_icon_path = updated_path
+                icon_cache.add(updated_path.rsplit("/", 1)[1])
+            elif updated_path.startswith("@"):
                 cache_icon_path = updated_path
             else:
-                ext = os.path.splitext(updated_path)[1]
-                cache_icon_path += ext
-                with open(updated_path, "rb") as file_in, \
-                    open(cache_icon_path, "wb") as file_out:
-                    file_out.write(file_in.read())
-                cache_icon_path = "cache://{}/{}".format(
-                    self.package_full_name(),
-                    os.path.basename(cache_icon_path))
+                # items with the same icon share the copy in the cache
+                cache_icon_path = icon_cache.url(icon_cache.store(stem, updated_path))
 
         self.dbg("icon cache path", cache_icon_path)
-        return self.load_icon(cache_icon_path)
+        return cache_icon_path
 
     def __make_context(self, id):
         return RepoContext(self, id)
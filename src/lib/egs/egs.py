@@ -1,12 +1,19 @@
 from winreg import ConnectRegistry, OpenKeyEx, QueryValueEx, HKEY_LOCAL_MACHINE
 
+from ..util import ManifestCache, dir_fingerprint, launch, launch_record
+
 import json
 import os
 
+def load_manifest(manifest_path):
+    with open(manifest_path, encoding="utf8") as fd:
+        return json.load(fd)
+
 class EGS:
     LAUNCHER_PATH = R"SOFTWARE\WOW6432Node\Epic Games\EpicGamesLauncher"
     ICON_PATH = R"SOFTWARE\Classes\com.epicgames.launcher\DefaultIcon"
     LAUNCH_CMD = "com.epicgames.launcher://apps/{name}?action=launch&silent=true"
+    MANIFESTS = ManifestCache()
 
     __context = None
     __valid = False
@@ -17,12 +24,29 @@ class EGS:
         context.dbg("install path", install_path)
 
         self.__exe_path = self.__get_exe_path()
+        self.__manifest_path = os.path.join(install_path, "Manifests")
 
         self.__games = self.__read_manifest(install_path)
 
+    @staticmethod
+    def fingerprint(context, settings):
+        root = ConnectRegistry(None, HKEY_LOCAL_MACHINE)
+        data_path = QueryValueEx(OpenKeyEx(root, EGS.LAUNCHER_PATH), "AppDataPath")[0]
+        return dir_fingerprint(os.path.join(data_path, "Manifests"), ".item")
+
     def run(self, kpu, appid, call_args):
-        target = EGS.LAUNCH_CMD.format(name = appid)
-        kpu.shell_execute(target)
+        launch(kpu, self.launch_record(appid), call_args, self.__context)
+
+    def launch_record(self, appid):
+        return launch_record(EGS.LAUNCH_CMD.format(name = appid))
+
+    @property
+    def watch_paths(self):
+        return [self.__manifest_path]
+
+    @property
+    def watch_extension(self):
+        return ".item"
 
     @property
     def items(self):
@@ -66,16 +90,17 @@ class EGS:
 
         games = []
 
-        for manifest_name in filter(is_manifest, os.listdir(manifest_path)):
+        manifest_names = list(filter(is_manifest, os.listdir(manifest_path)))
+        EGS.MANIFESTS.retain([os.path.join(manifest_path, manifest_name) for manifest_name in manifest_names])
+        for manifest_name in manifest_names:
             try:
-                with open(os.path.join(manifest_path, manifest_name), encoding="utf8") as fd:
-                    manifest = json.load(fd)
-                    if os.path.exists(manifest["InstallLocation"]):
-                        games.append({
-                            "appid": manifest['AppName'],
-                            "name": manifest['DisplayName'],
-                            "exe_path": os.path.join(manifest["InstallLocation"], manifest["LaunchExecutable"]),
-                        })
+                manifest = EGS.MANIFESTS.get(os.path.join(manifest_path, manifest_name), load_manifest)
+                if os.path.exists(manifest["InstallLocation"]):
+                    games.append({
+                        "appid": manifest['AppName'],
+                        "name": manifest['DisplayName'],
+                        "exe_path": os.path.join(manifest["InstallLocation"], manifest["LaunchExecutable"]),
+                    })
             except Exception as e:
                 self.__context.err("Failed to read manifest", manifest_name, e)
 
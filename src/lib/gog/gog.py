@@ -1,6 +1,6 @@
 from winreg import ConnectRegistry, EnumKey, OpenKeyEx, QueryValueEx, HKEY_LOCAL_MACHINE
 
-from ..util import RegKeyIter
+from ..util import RegKeyIter, launch, launch_record, regkey_fingerprint
 
 import os
 from urllib import parse
@@ -19,11 +19,27 @@ class GOG:
         self.__exe_path = self.__get_exe_path()
         self.__games = self.__read_manifest()
 
+    @staticmethod
+    def fingerprint(context, settings):
+        return regkey_fingerprint(OpenKeyEx(HKEY_LOCAL_MACHINE, GOG.GAMES_PATH))
+
     def run(self, kpu, target, call_args):
+        launch(kpu, self.launch_record(target), call_args, self.__context)
+
+    def launch_record(self, target):
         appid, game_path = target.split('|', 1)
         args = GOG.LAUNCHER_ARGS.format(appid=appid, game_path=game_path)
 
-        kpu.shell_execute(self.__exe_path, args=args)
+        return launch_record(self.__exe_path, args=args)
+
+    @property
+    def watch_paths(self):
+        # the games are read from the registry
+        return []
+
+    @property
+    def watch_extension(self):
+        return None
 
     @property
     def items(self):
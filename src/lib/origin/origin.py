@@ -1,11 +1,23 @@
 from winreg import ConnectRegistry, OpenKeyEx, QueryValueEx, HKEY_LOCAL_MACHINE
 
+from ..util import ManifestCache, dir_fingerprint, launch, launch_record
+
 import os
 from urllib import parse
 
+def load_manifest(manifest_path):
+    with open(manifest_path) as fd:
+        manifest = fd.read()
+    # this is a pretty roundabout way to get rid of the leading ? but maybe a little bit more robust
+    # than simply taking a substring
+    par_raw = parse.urlparse("http://dummy/" + manifest).query.split('&')
+
+    return dict(map(lambda i: parse.unquote(i).split("="), par_raw))
+
 class Origin:
     PATH = r"SOFTWARE\WOW6432Node\Origin"
     LAUNCHER_CMD = "origin2://game/launch?offerIds={name}"
+    MANIFESTS = ManifestCache()
 
     __context = None
     __valid = False
@@ -17,9 +29,29 @@ class Origin:
 
         self.__games = self.__read_manifest(self.__exe_path)
 
+    @staticmethod
+    def fingerprint(context, settings):
+        # each game has its own directory in LocalContent, the modification time of those changes
+        # when manifests get added or removed
+        return dir_fingerprint(Origin.manifests_path())
+
+    @staticmethod
+    def manifests_path():
+        return os.path.join(os.environ["ProgramData"], "Origin", "LocalContent")
+
     def run(self, kpu, appid, call_args):
-        target = Origin.LAUNCHER_CMD.format(name=appid)
-        kpu.shell_execute(target)
+        launch(kpu, self.launch_record(appid), call_args, self.__context)
+
+    def launch_record(self, appid):
+        return launch_record(Origin.LAUNCHER_CMD.format(name=appid))
+
+    @property
+    def watch_paths(self):
+        return [Origin.manifests_path()]
+
+    @property
+    def watch_extension(self):
+        return None
 
     @property
     def items(self):
@@ -47,7 +79,7 @@ class Origin:
             self.__context.warn("Failed to find store path, maybe it isn't installed", e)
 
     def __read_manifest(self, install_path):
-        manifests_path = os.path.join(os.environ["ProgramData"], "Origin", "LocalContent")
+        manifests_path = Origin.manifests_path()
 
         is_manifest = lambda p: os.path.splitext(p)[1] == '.mfst'
 
@@ -60,27 +92,24 @@ class Origin:
             self.__context.info("No Origin manifests, the EA App is not supported")
             return []
 
+        manifest_paths = []
         for game_name in os.listdir(manifests_path):
             for manifest_name in filter(is_manifest, os.listdir(os.path.join(manifests_path, game_name))):
                 try:
                     manifest_path = os.path.join(manifests_path, game_name, manifest_name)
-                    with open(manifest_path) as fd:
-                        manifest = fd.read()
-                        # this is a pretty roundabout way to get rid of the leading ? but maybe a little bit more robust
-                        # than simply taking a substring
-                        par_raw = parse.urlparse("http://dummy/" + manifest).query.split('&')
-
-                        parameters = dict(map(lambda i: parse.unquote(i).split("="), par_raw))
-                        # there may be multiple manifests for dlcs and such, dipinstallpath is our marker for the "main"
-                        # manifest. However, apparently it's only the path where the game was initially installed,
-                        # if the game was moved this path wouldn't be valid any more
-                        if "dipinstallpath" in parameters\
-                            and (os.path.exists(parameters["dipinstallpath"]) or True):
-                            games.append({
-                                "appid": parameters["id"],
-                                "name": game_name,
-                            })
+                    manifest_paths.append(manifest_path)
+                    parameters = Origin.MANIFESTS.get(manifest_path, load_manifest)
+                    # there may be multiple manifests for dlcs and such, dipinstallpath is our marker for the "main"
+                    # manifest. However, apparently it's only the path where the game was initially installed,
+                    # if the game was moved this path wouldn't be valid any more
+                    if "dipinstallpath" in parameters\
+                        and (os.path.exists(parameters["dipinstallpath"]) or True):
+                        games.append({
+                            "appid": parameters["id"],
+                            "name": game_name,
+                        })
                 except Exception as e:
                     self.__context.err("Failed to read manifest", manifest_name, e)
+        Origin.MANIFESTS.retain(manifest_paths)
 
         return games
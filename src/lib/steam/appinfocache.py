@@ -0,0 +1,196 @@
+import json
+import os
+
+from .vdf import mapped_file, parse_appinfo, parse_appinfo_records
+
+# bump this whenever the layout of the cached data changes so that stale caches
+# from older versions of the plugin get discarded
+CACHE_VERSION = 4
+
+def appinfo_fingerprint(appinfo_path: str):
+    """
+    cheap fingerprint of appinfo.vdf, consisting of the file size, the modification time
+    and the magic number of the header. If any of these change we have to assume the content
+    changed as well
+    """
+    stat = os.stat(appinfo_path)
+    with open(appinfo_path, "rb") as fd:
+        magic = fd.read(4)
+    return {
+        "size": stat.st_size,
+        "mtime": stat.st_mtime_ns,
+        "magic": magic.hex(),
+    }
+
+# the parts of the appinfo records we actually use, everything else is skipped while decoding
+APPINFO_PATHS = [
+    "appinfo/common/name",
+    "appinfo/common/clienticon",
+    "appinfo/config/launch",
+]
+
+def compact_appinfo(app: dict):
+    """
+    reduce a parsed appinfo record to the fields the plugin actually uses
+    """
+    appinfo = app["data"].get("appinfo", {})
+    common = appinfo.get("common", {})
+    return {
+        "name": common.get("name"),
+        "clienticon": common.get("clienticon"),
+        "launch": appinfo.get("config", {}).get("launch"),
+        **record_version(app),
+    }
+
+def record_version(app: dict):
+    """
+    the values steam uses to track changes of an individual app record
+    """
+    binary_data_hash = app.get("binary_data_hash")
+    return {
+        "change_number": app["change_number"],
+        "sha1": app["sha1"].hex(),
+        "binary_data_hash": binary_data_hash.hex() if binary_data_hash is not None else None,
+    }
+
+def record_changed(app: dict, cached: dict):
+    """
+    determine if the app record has changed compared to the cached version of it
+    """
+    if cached is None:
+        return True
+    return any(cached.get(key) != value for key, value in record_version(app).items())
+
+def read_appinfo(appinfo_path: str, appids: list, previous: dict):
+    """
+    decode the data we need for the requested apps from appinfo.vdf.
+    previous is the outdated cache (see AppInfoCache.load_outdated), apps that didn't change are
+    taken from there instead of being decoded again.
+    Returns the apps and the offsets of all records in the file (see AppInfoIndex)
+    """
+    is_changed = lambda app: record_changed(app, previous.get(str(app["appid"])))
+
+    apps = {}
+    offsets = {}
+    with open(appinfo_path, "rb") as fd:
+        header, appinfo = parse_appinfo(fd, set(int(appid) for appid in appids), APPINFO_PATHS, offsets, is_changed)
+        for app in appinfo:
+            appid = str(app["appid"])
+            # apps that weren't decoded didn't change since the last time
+            apps[appid] = compact_appinfo(app) if "data" in app else previous[appid]
+
+    return apps, offsets
+
+def index_appinfo(appinfo_path: str):
+    """
+    find the offsets of all records in appinfo.vdf without decoding any of them
+    """
+    offsets = {}
+    with open(appinfo_path, "rb") as fd:
+        header, appinfo = parse_appinfo(fd, set(), index=offsets)
+        for app in appinfo:
+            pass
+    return offsets
+
+def read_appinfo_records(appinfo_path: str, records: list, previous: dict):
+    """
+    decode the data we need from the records at the specified offsets.
+    records is a list of (appid, offset) tuples, previous is used the same way as in read_appinfo
+    """
+    is_changed = lambda app: record_changed(app, previous.get(str(app["appid"])))
+
+    apps = {}
+    with open(appinfo_path, "rb") as fd, mapped_file(fd) as buf:
+        appids = [appid for appid, offset in records]
+        appinfo = parse_appinfo_records(buf, [offset for appid, offset in records], APPINFO_PATHS, is_changed)
+        for appid, app in zip(appids, appinfo):
+            apps[appid] = compact_appinfo(app) if "data" in app else previous[appid]
+
+    return apps
+
+def _load_json(path: str):
+    try:
+        with open(path, encoding="utf8") as fd:
+            cached = json.load(fd)
+    except (OSError, ValueError):
+        return None
+
+    if cached.get("version") != CACHE_VERSION:
+        return None
+
+    return cached
+
+def _save_json(path: str, fingerprint: dict, data: dict):
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf8") as fd:
+        json.dump({
+            "version": CACHE_VERSION,
+            "fingerprint": fingerprint,
+            **data,
+        }, fd)
+    # replace atomically so a crash while writing doesn't leave a broken cache behind
+    os.replace(temp_path, path)
+
+class AppInfoCache:
+    """
+    on-disk cache of the data we extract from appinfo.vdf so that we don't have to decode
+    the (potentially huge) binary vdf as long as it didn't change
+    """
+    FILE_NAME = "steam_appinfo.json"
+
+    def __init__(self, cache_path: str):
+        self.__path = os.path.join(cache_path, AppInfoCache.FILE_NAME)
+
+    def load(self, fingerprint: dict):
+        """
+        returns the set of appids the cache was built for and the cached apps if the cache
+        matches the fingerprint, None otherwise
+        """
+        cached = _load_json(self.__path)
+        if cached is None or cached["fingerprint"] != fingerprint:
+            return None
+
+        return set(cached["appids"]), cached["apps"]
+
+    def load_outdated(self, fingerprint: dict):
+        """
+        returns the cached apps even if appinfo.vdf has changed since, as long as the file
+        format is still the same. The individual apps may be outdated, see record_changed.
+        Returns None if there is no usable cache
+        """
+        cached = _load_json(self.__path)
+        if cached is None or cached["fingerprint"]["magic"] != fingerprint["magic"]:
+            return None
+
+        return cached["apps"]
+
+    def save(self, fingerprint: dict, appids: set, apps: dict):
+        _save_json(self.__path, fingerprint, {
+            "appids": sorted(appids),
+            "apps": apps,
+        })
+
+class AppInfoIndex:
+    """
+    sidecar index of appinfo.vdf, mapping each appid to offset and size of its record in the file
+    so that individual apps can be looked up without going through the whole file
+    """
+    FILE_NAME = "steam_appinfo_index.json"
+
+    def __init__(self, cache_path: str):
+        self.__path = os.path.join(cache_path, AppInfoIndex.FILE_NAME)
+
+    def load(self, fingerprint: dict):
+        """
+        returns the index (appid -> [offset, size]) if it matches the fingerprint, None otherwise
+        """
+        cached = _load_json(self.__path)
+        if cached is None or cached["fingerprint"] != fingerprint:
+            return None
+
+        return cached["offsets"]
+
+    def save(self, fingerprint: dict, offsets: dict):
+        _save_json(self.__path, fingerprint, {
+            "offsets": {str(appid): offset for appid, offset in offsets.items()},
+        })
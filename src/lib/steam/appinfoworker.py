@@ -0,0 +1,95 @@
+import json
+import os
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from .appinfocache import index_appinfo
+
+# executed by the worker interpreter. The steam directory is imported as a bare package so
+# that only the appinfo modules get loaded, not the plugin (which requires keypirinha)
+WORKER_SCRIPT = """
+import json, sys, types
+package = types.ModuleType("amg_steam")
+package.__path__ = [sys.argv[1]]
+sys.modules["amg_steam"] = package
+from amg_steam import appinfocache
+call = json.load(sys.stdin)
+json.dump(getattr(appinfocache, call["function"])(*call["args"]), sys.stdout)
+"""
+
+# how long we wait for the worker before giving up
+WORKER_TIMEOUT = 120
+
+def find_python(configured: str = None):
+    """
+    find a python interpreter to run the worker with. Inside keypirinha, sys.executable is
+    keypirinha itself, so unless configured explicitly, this may not find anything
+    """
+    candidates = [configured] if configured else [sys.executable, getattr(sys, "_base_executable", None)]
+    for candidate in candidates:
+        if candidate and os.path.basename(candidate).lower().startswith("python") and os.path.isfile(candidate):
+            return candidate
+    raise FileNotFoundError("No python interpreter found to run the worker process")
+
+def _start_worker(python: str, function: str, *args):
+    proc = subprocess.Popen(
+        [python, "-c", WORKER_SCRIPT, os.path.dirname(os.path.abspath(__file__))],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        encoding="utf8",
+        creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0))
+    return proc, json.dumps({"function": function, "args": args})
+
+def _finish_worker(worker):
+    proc, call = worker
+    try:
+        stdout, stderr = proc.communicate(call, timeout=WORKER_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.communicate()
+        raise
+
+    if proc.returncode != 0:
+        raise RuntimeError("worker process failed: {}".format(stderr.strip()))
+
+    return json.loads(stdout)
+
+def read_appinfo_in_worker(python: str, appinfo_path: str, appids: list, previous: dict):
+    """
+    same as appinfocache.read_appinfo but runs in a separate, short-lived process so the memory
+    used for decoding appinfo.vdf is returned to the system as soon as it's done
+    """
+    worker = _start_worker(find_python(python), "read_appinfo", appinfo_path, appids, previous)
+    apps, offsets = _finish_worker(worker)
+    return apps, offsets
+
+def read_appinfo_parallel(python: str, appinfo_path: str, appids: list, previous: dict, num_workers: int):
+    """
+    same as appinfocache.read_appinfo but the records are split up between multiple worker processes
+    which decode them in parallel
+    """
+    python = find_python(python)
+
+    # finding the records is cheap, we only have to read the record headers
+    offsets = index_appinfo(appinfo_path)
+    records = [(appid, offsets[int(appid)][0]) for appid in sorted(appids) if int(appid) in offsets]
+
+    chunk_size = max(1, -(-len(records) // num_workers))
+    workers = [_start_worker(python, "read_appinfo_records", appinfo_path, records[idx:idx + chunk_size], previous)
+               for idx in range(0, len(records), chunk_size)]
+
+    apps = {}
+    try:
+        # each worker only starts decoding once it got its input, so all of them have to be fed
+        # (and read from) at the same time
+        with ThreadPoolExecutor(max_workers=len(workers) or 1, thread_name_prefix="AllMyGames-appinfo") as executor:
+            for result in executor.map(_finish_worker, workers):
+                apps.update(result)
+    finally:
+        for proc, call in workers:
+            if proc.poll() is None:
+                proc.kill()
+
+    return apps, offsets
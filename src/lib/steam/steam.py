@@ -1,13 +1,14 @@
 import json
 import logging
 import os
-import subprocess
 import sys
-import time
+import threading
 from hashlib import sha1
 import traceback
-from .vdf import load as vdfload, parse_appinfo
-from ..util import CILookup
+from .vdf import load as vdfload, mapped_file, parse_appinfo_records
+from .appinfocache import APPINFO_PATHS, AppInfoCache, AppInfoIndex, appinfo_fingerprint, compact_appinfo, read_appinfo
+from .appinfoworker import read_appinfo_in_worker, read_appinfo_parallel
+from ..util import CILookup, ManifestCache, dir_fingerprint, file_fingerprint, launch, launch_record
 from functools import reduce
 from winreg import ConnectRegistry, OpenKeyEx, QueryValueEx, HKEY_CURRENT_USER
 from ..util import RepoContext
@@ -17,9 +18,19 @@ osarch = "64" if sys.maxsize > 2**32 else "32"
 def tobool(inp: str):
     return inp.lower() in ["true", "yes", "1"]
 
-def to_appinfo_dict(agg, input, context):
-    agg[str(input["appid"])] = input
-    return agg
+def toint(inp: str, default: int):
+    try:
+        return int(inp)
+    except (TypeError, ValueError):
+        return default
+
+def join_appinfo(game: dict, appinfo: dict):
+    try:
+        app = appinfo[game["appid"]]
+        game["icon_id"] = app["clienticon"]
+        game["launchers"] = app["launch"]
+    except:
+        pass
 
 def launcher_supported(game_path, launcher, store_enabled):
     # ignore default launchers, these should be covered by the option to start
@@ -82,78 +93,163 @@ def to_catalog(agg: list, game, direct, store):
 
     return agg
 
-def is_steam_running():
-    startupinfo = subprocess.STARTUPINFO()
-    startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-    output, err = subprocess.Popen(["tasklist.exe",
-                                   "/FI", "IMAGENAME eq steam.exe"],
-                                    stdout=subprocess.PIPE).communicate()
-    return str(output).find("steam.exe") != -1
+def get_install_path():
+    root = ConnectRegistry(None, HKEY_CURRENT_USER)
+    steam_key = OpenKeyEx(root, Steam.PATH)
+    res_exe = QueryValueEx(steam_key, "SteamExe")
+    res_path = QueryValueEx(steam_key, "SteamPath")
+    return res_exe[0], os.path.normpath(res_path[0])
+
+def get_library_paths(install_path: str):
+    """
+    all library folders, including the one in the steam install path
+    """
+    if os.path.exists(os.path.join(install_path, 'config', 'libraryfolders.vdf')):
+        library_paths = get_library_paths_new(install_path)
+    else:
+        library_paths = get_library_paths_old(install_path)
+    library_paths.insert(0, install_path)
+    return library_paths
+
+def get_library_paths_new(install_path: str):
+    with open(os.path.join(install_path, 'config', 'libraryfolders.vdf')) as fd:
+        # the vdf library is case sensitive but the format actually seems to
+        # be case insensitive
+        vdict = CILookup(vdfload(fd))
+        base = vdict['libraryfolders']
+        return list(map(
+            lambda x: base[x]["path"],
+            filter(lambda x: x.isnumeric(), base.keys())))
+
+def get_library_paths_old(install_path: str):
+    with open(os.path.join(install_path, 'config', 'config.vdf')) as fd:
+        # the vdf library is case sensitive but the format actually seems to
+        # be case insensitive
+        vdict = CILookup(vdfload(fd))
+        base = vdict['InstallConfigStore']['Software']['Valve']['Steam']
+        return list(map(
+            lambda x: base[x],
+            filter(lambda x: x.lower().startswith('baseinstallfolder_'),
+                   base.keys())))
+
+def load_manifest(manifest_path: str):
+    with open(manifest_path, encoding='utf8') as fd:
+        return vdfload(fd)
 
 class Steam:
     PATH = r"SOFTWARE\Valve\Steam"
+    # steam sets these values once it's started up and the user is logged in
+    ACTIVE_PROCESS_PATH = r"Software\Valve\Steam\ActiveProcess"
+    MANIFESTS = ManifestCache()
+    # held while the appinfo cache is refreshed in the background (fast mode)
+    REFRESH_LOCK = threading.Lock()
 
     __context: RepoContext = None
     __valid = False
     __exe_path = None
     __install_path = None
-    __appinfo = None
     __direct = False
     __store = True
+    __worker = False
+    __worker_python = None
+    __workers = 1
+    __fast = False
 
     def __init__(self, context: RepoContext, settings):
         self.__context = context
         self.__valid = False
         self.__direct = tobool(settings.get("direct", "false"))
         self.__store = tobool(settings.get("store", "true"))
+        self.__worker = tobool(settings.get("worker", "false"))
+        self.__worker_python = settings.get("worker_python") or None
+        workers = toint(settings.get("workers", "1"), None)
+        if workers is None:
+            context.warn("Invalid number of workers, using 1", settings.get("workers"))
+        self.__workers = max(1, workers or 1)
+        self.__fast = tobool(settings.get("fast", "false"))
         self.__exe_path, self.__install_path = self.__get_install_path()
         context.dbg("install path", self.__install_path)
-        self.__appinfo = self.__get_appinfo(self.__install_path)
-        library_paths = self.__get_library_paths(self.__install_path)
-        library_paths.insert(0, self.__install_path)
+        library_paths = get_library_paths(self.__install_path)
         context.dbg("libraries", library_paths)
+        self.__library_paths = library_paths
 
         games = []
+        manifest_paths = []
         for library in library_paths:
-            games = games + self.__read_manifests(library)
+            games = games + self.__read_manifests(library, manifest_paths)
+        Steam.MANIFESTS.retain(manifest_paths)
+
+        # only the installed games are of interest so there is no point decoding the
+        # appinfo for all the other apps the user owns.
+        # The appinfo is only needed to complete the game entries, we don't keep it around
+        appids = set(game["appid"] for game in games)
+        if self.__fast:
+            appinfo = self.__get_cached_appinfo(self.__install_path, appids)
+        else:
+            appinfo = self.__get_appinfo(self.__install_path, appids)
+        for game in games:
+            join_appinfo(game, appinfo)
+        del appinfo
 
         self.__games = games
+        self.__games_by_id = {game["appid"]: game for game in games}
+
+    @staticmethod
+    def fingerprint(context: RepoContext, settings):
+        """
+        cheap fingerprint of everything the steam games are read from. If this doesn't change,
+        the list of games doesn't either
+        """
+        exe_path, install_path = get_install_path()
+        library_paths = get_library_paths(install_path)
+        result = {
+            "config": [file_fingerprint(os.path.join(install_path, 'config', name))
+                       for name in ['libraryfolders.vdf', 'config.vdf']],
+            "libraries": [dir_fingerprint(os.path.join(library, 'steamapps'), ".acf") for library in library_paths],
+            "appinfo": file_fingerprint(os.path.join(install_path, 'appcache', 'appinfo.vdf')),
+        }
+        # in fast mode the appinfo may be updated in the background. Otherwise the cache is only
+        # written while the store is scanned so it would just cause another scan
+        if tobool(settings.get("fast", "false")):
+            result["appinfo_cache"] = file_fingerprint(os.path.join(context.cache_path, AppInfoCache.FILE_NAME))
+        return result
 
     def run(self, kpu, target, call_args):
+        launch(kpu, self.launch_record(target), call_args, self.__context)
+
+    def launch_record(self, target):
         launcher_id, appid = target.split("|", 1)
         if launcher_id != "":
-            game = next(game for game in self.__games if game["appid"] == appid)
+            game = self.__games_by_id[appid]
             launcher: dict = game["launchers"][launcher_id]
             if "executable" in launcher:
-                self.__context.dbg("starting steam game with launcher", launcher)
-                return self.run_directly(kpu, game, launcher, appid, call_args)
-
-        return self.run_through_steam(kpu, appid, call_args)
-
-    def run_directly(self, kpu, game: dict, launcher: dict, appid: str, call_args: str):
-        args = None
-        if "executable" in launcher:
-            full_path = os.path.join(game["path"], launcher["executable"])
-            os.environ["SteamAPPId"] = game["appid"]
-
-            # since we're not running with steam -applaunch, steam will not be started
-            # automatically but some games won't run correctly
-            if not is_steam_running():
-                self.__context.dbg("steam not running, starting it now")
-                kpu.shell_execute(self.__exe_path)
-                # arbitrary, is 5 seconds enough? I think as long as steam is starting up
-                # the game will wait if necessary for it to complete initializing
-                time.sleep(5)
-            kpu.shell_execute(
-                full_path,
-                args=launcher.get("arguments", "") + " " + call_args,
-                working_dir=launcher.get("workingdir", ""))
-
-    def run_through_steam(self, kpu, appid: str, call_args: str):
-        target = "-applaunch {} {}".format(appid, call_args)
-        self.__context.dbg(
-            "starting steam game through applaunch link", target)
-        kpu.shell_execute(self.__exe_path, args=target)
+                return self.launch_directly(game, launcher)
+
+        return self.launch_through_steam(appid)
+
+    def launch_directly(self, game: dict, launcher: dict):
+        # since we're not running with steam -applaunch, steam will not be started
+        # automatically but some games won't run correctly
+        return launch_record(
+            os.path.join(game["path"], launcher["executable"]),
+            args=launcher.get("arguments", ""),
+            working_dir=launcher.get("workingdir", ""),
+            env={"SteamAPPId": game["appid"]},
+            requires={"process": "steam.exe", "file": self.__exe_path,
+                      "ready": {"key": Steam.ACTIVE_PROCESS_PATH, "values": ["pid", "ActiveUser"]}},
+            call_args=True)
+
+    def launch_through_steam(self, appid: str):
+        return launch_record(self.__exe_path, args="-applaunch {}".format(appid), call_args=True)
+
+    @property
+    def watch_paths(self):
+        return [os.path.join(library, 'steamapps') for library in self.__library_paths]
+
+    @property
+    def watch_extension(self):
+        # only the manifests matter, steam keeps other files there that change all the time
+        return ".acf"
 
     @property
     def items(self):
@@ -193,80 +289,131 @@ class Steam:
 
     def __get_install_path(self):
         try:
-            root = ConnectRegistry(None, HKEY_CURRENT_USER)
-            steam_key = OpenKeyEx(root, Steam.PATH)
-            res_exe = QueryValueEx(steam_key, "SteamExe")
-            res_path = QueryValueEx(steam_key, "SteamPath")
+            res = get_install_path()
             self.__valid = True
-            return res_exe[0], os.path.normpath(res_path[0])
+            return res
         except Exception as e:
             self.__context.warn("Failed to find path, maybe isn't installed", e)
 
-    def __get_appinfo(self, install_path: str):
-        with open(os.path.join(install_path, 'appcache', 'appinfo.vdf'), "rb") as fd:
+    def __get_cached_appinfo(self, install_path: str, appids: set):
+        """
+        get the appinfo without parsing appinfo.vdf. If the cache is outdated we refresh it in
+        the background so that the next catalog update can use it
+        """
+        appinfo_path = os.path.join(install_path, 'appcache', 'appinfo.vdf')
+        cache = AppInfoCache(self.__context.cache_path)
+        fingerprint = appinfo_fingerprint(appinfo_path)
+        cached = cache.load(fingerprint)
+        if cached is not None:
+            cached_appids, apps = cached
+            if appids.issubset(cached_appids):
+                return apps
+        else:
+            # steam rewrites appinfo.vdf all the time, most of the cached data is still correct
+            apps = cache.load_outdated(fingerprint) or {}
+
+        # only one refresh at a time, a refresh that is already running takes care of it
+        if Steam.REFRESH_LOCK.acquire(blocking=False):
+            self.__context.dbg("appinfo cache outdated, updating it in the background")
+            threading.Thread(target=self.__refresh_appinfo_cache, args=(install_path, appids), daemon=True).start()
+        return apps
+
+    def __refresh_appinfo_cache(self, install_path: str, appids: set):
+        try:
+            self.__get_appinfo(install_path, appids)
+        except Exception as e:
+            self.__context.warn("Failed to update appinfo cache", e)
+            return
+        finally:
+            Steam.REFRESH_LOCK.release()
+        # the updated cache changes the fingerprint of the store so it gets scanned again
+        self.__context.request_update()
+
+    def __get_appinfo(self, install_path: str, appids: set):
+        appinfo_path = os.path.join(install_path, 'appcache', 'appinfo.vdf')
+        cache = AppInfoCache(self.__context.cache_path)
+        index = AppInfoIndex(self.__context.cache_path)
+        fingerprint = appinfo_fingerprint(appinfo_path)
+
+        cached = cache.load(fingerprint)
+        if cached is not None:
+            cached_appids, apps = cached
+            missing = appids - cached_appids
+            if len(missing) == 0:
+                self.__context.dbg("appinfo.vdf unchanged, using cached data")
+                return apps
+
+            # appinfo.vdf didn't change but games were installed, if we have an index
+            # we can look those up directly
+            offsets = index.load(fingerprint)
+            if offsets is not None:
+                self.__context.dbg("appinfo.vdf unchanged, looking up new games", missing)
+                apps.update(self.__lookup_appinfo(appinfo_path, offsets, missing))
+                self.__save_cache(cache, fingerprint, cached_appids | appids, apps)
+                return apps
+
+        # even if appinfo.vdf changed, most apps in it usually didn't. Those we can take from the cache
+        previous = cache.load_outdated(fingerprint) or {}
+
+        try:
+            apps, offsets = self.__read_appinfo(appinfo_path, appids, previous)
+        except Exception as e:
+            self.__context.err("Failed to parse appinfo.vdf", traceback.format_exc())
+            raise e
+
+        self.__save_cache(cache, fingerprint, appids, apps)
+        self.__save_cache(index, fingerprint, offsets)
+
+        return apps
+
+    def __read_appinfo(self, appinfo_path: str, appids: set, previous: dict):
+        if self.__worker:
             try:
-                header, appinfo = parse_appinfo(fd)
+                if self.__workers > 1:
+                    return read_appinfo_parallel(self.__worker_python, appinfo_path, list(appids), previous, self.__workers)
+                return read_appinfo_in_worker(self.__worker_python, appinfo_path, list(appids), previous)
             except Exception as e:
-                self.__context.err("Failed to parse appinfo.vdf", traceback.format_exc())
-                raise e
-            return reduce(lambda prev, item: to_appinfo_dict(prev, item, self.__context), appinfo, {})
+                self.__context.warn("Failed to parse appinfo.vdf in worker process, parsing in-process instead", e)
+
+        return read_appinfo(appinfo_path, list(appids), previous)
+
+    def __lookup_appinfo(self, appinfo_path: str, offsets: dict, appids: set):
+        # apps that aren't in the index aren't in appinfo.vdf at all
+        found = [appid for appid in appids if appid in offsets]
+        apps = {}
+        # the file is only mapped once for all apps and the mapping is released right away so it
+        # doesn't keep steam from replacing the file
+        with open(appinfo_path, "rb") as fd, mapped_file(fd) as buf:
+            appinfo = parse_appinfo_records(buf, [offsets[appid][0] for appid in found], APPINFO_PATHS)
+            for appid, app in zip(found, appinfo):
+                apps[appid] = compact_appinfo(app)
+        return apps
+
+    def __save_cache(self, cache, *args):
+        try:
+            cache.save(*args)
+        except Exception as e:
+            self.__context.warn("Failed to write appinfo cache", e)
 
-    def __get_library_paths(self, install_path: str):
-        if os.path.exists(os.path.join(install_path, 'config', 'libraryfolders.vdf')):
-            return self.__get_library_paths_new(install_path)
-        else:
-            return self.__get_library_paths_old(install_path)
-
-    def __get_library_paths_new(self, install_path: str):
-        with open(os.path.join(install_path, 'config', 'libraryfolders.vdf')) as fd:
-            # the vdf library is case sensitive but the format actually seems to
-            # be case insensitive
-            vdict = CILookup(vdfload(fd))
-            base = vdict['libraryfolders']
-            return list(map(
-                lambda x: base[x]["path"],
-                filter(lambda x: x.isnumeric(), base.keys())))
-
-    def __get_library_paths_old(self, install_path: str):
-        with open(os.path.join(install_path, 'config', 'config.vdf')) as fd:
-            # the vdf library is case sensitive but the format actually seems to
-            # be case insensitive
-            vdict = CILookup(vdfload(fd))
-            base = vdict['InstallConfigStore']['Software']['Valve']['Steam']
-            return list(map(
-                lambda x: base[x],
-                filter(lambda x: x.lower().startswith('baseinstallfolder_'),
-                       base.keys())))
-
-    def __read_manifests(self, library_path: str):
+    def __read_manifests(self, library_path: str, manifest_paths: list):
         is_manifest = lambda file_name: file_name.startswith('appmanifest_') and file_name.endswith('.acf')
         games = []
 
         try:
             apps_path = os.path.join(library_path, 'steamapps')
             for manifest_path in filter(is_manifest, os.listdir(apps_path)):
+                manifest_paths.append(os.path.join(apps_path, manifest_path))
                 try:
-                    with open(os.path.join(apps_path, manifest_path), encoding='utf8') as fd:
-                        manifest = vdfload(fd)
-                        appid = manifest['AppState']['appid']
-                        iconid = None
-                        launchers = None
-                        try:
-                            appinfo = self.__appinfo[appid]["data"]["appinfo"]
-                            iconid = appinfo["common"]["clienticon"]
-                            launchers = appinfo["config"]["launch"]
-                        except:
-                            pass
-
-                        games.append({
-                            "appid": appid,
-                            "name": manifest["AppState"]["name"],
-                            "path": os.path.join(apps_path, "common", manifest["AppState"]["installdir"]),
-                            "icon_id": iconid,
-                            "launchers": launchers,
-                        })
+                    manifest = Steam.MANIFESTS.get(os.path.join(apps_path, manifest_path), load_manifest)
+                    games.append({
+                        "appid": manifest['AppState']['appid'],
+                        "name": manifest["AppState"]["name"],
+                        "path": os.path.join(apps_path, "common", manifest["AppState"]["installdir"]),
+                        "icon_id": None,
+                        "launchers": None,
+                    })
                 except Exception as e:
                     self.__context.warn("Failed to read manifest", manifest_path, e)
         except Exception as e:
             self.__context.warn("Failed to read library path", library_path, e)
-        return games
+        return games
\ No newline at end of file
@@ -9,10 +9,12 @@ __version__ = "3.3"
 __author__ = "Rossen Georgiev"
 
 import io
+import mmap
 import re
 import sys
 import struct
 from binascii import crc32
+from contextlib import contextmanager
 from io import BufferedReader, BytesIO
 from io import StringIO as unicodeIO
 
@@ -292,7 +294,12 @@ def binary_loads(b, mapper=dict, merge_duplicate_keys=True, alt_format=False, ra
     if not isinstance(b, bytes):
         raise TypeError("Expected s to be bytes, got %s" % type(b))
 
-    return binary_load(BytesIO(b), mapper, merge_duplicate_keys, alt_format, raise_on_remaining, string_table)
+    result, offset = binary_load_buffer(b, 0, mapper, merge_duplicate_keys, alt_format, string_table)
+
+    if raise_on_remaining and offset < len(b):
+        raise SyntaxError("Binary VDF ended at offset %d, but there is more data remaining" % offset)
+
+    return result
 
 def binary_load(fp, mapper=dict, merge_duplicate_keys=True, alt_format=False, raise_on_remaining=False, string_table=None):
     """
@@ -408,6 +415,329 @@ def binary_load(fp, mapper=dict, merge_duplicate_keys=True, alt_format=False, ra
 
     return stack.pop()
 
+def binary_load_buffer(buf, offset=0, mapper=dict, merge_duplicate_keys=True, alt_format=False, string_table=None):
+    """
+    Deserialize binary VDF from ``buf`` starting at ``offset`` to a Python object.
+
+    ``buf`` can be ``bytes`` or a ``mmap`` (anything supporting indexing, slicing and ``find()``).
+    Unlike :func:`binary_load` this doesn't go through a file object, all values are read
+    directly from the buffer, so this is a lot faster on big files.
+
+    Returns a tuple of the deserialized object and the offset right behind the binary VDF.
+
+    ``mapper``, ``merge_duplicate_keys``, ``alt_format`` and ``string_table`` work the same as
+    for :func:`binary_load`.
+    """
+    if not issubclass(mapper, Mapping):
+        raise TypeError("Expected mapper to be subclass of dict, got %s" % type(mapper))
+
+    # helpers
+    int32 = struct.Struct('<i')
+    uint64 = struct.Struct('<Q')
+    int64 = struct.Struct('<q')
+    float32 = struct.Struct('<f')
+    uint32 = struct.Struct('<I')
+
+    def read_string(pos, wide=False):
+        end = buf.find(b'\x00\x00' if wide else b'\x00', pos)
+
+        if end == -1:
+            raise SyntaxError("Unterminated cstring (offset: %d)" % pos)
+
+        if wide:
+            end += (end - pos) % 2
+            return buf[pos:end].decode('utf-16'), end + 2
+
+        return buf[pos:end].decode('utf-8', 'replace'), end + 1
+
+    stack = [mapper()]
+    CURRENT_BIN_END = ord(BIN_END if not alt_format else BIN_END_ALT)
+    T_NONE, T_STRING, T_INT32, T_FLOAT32, T_POINTER, T_WIDESTRING, T_COLOR, T_UINT64, T_INT64 = (
+        ord(t) for t in (BIN_NONE, BIN_STRING, BIN_INT32, BIN_FLOAT32, BIN_POINTER,
+                         BIN_WIDESTRING, BIN_COLOR, BIN_UINT64, BIN_INT64))
+
+    pos = offset
+    size = len(buf)
+
+    while pos < size:
+        t = buf[pos]
+        pos += 1
+
+        if t == CURRENT_BIN_END:
+            if len(stack) > 1:
+                stack.pop()
+                continue
+            break
+
+        if string_table is None:
+            key, pos = read_string(pos)
+        else:
+            idx = uint32.unpack_from(buf, pos)[0]
+            pos += 4
+            if idx > len(string_table):
+                raise Exception(f"idx out of range: {idx} / {len(string_table)}")
+            key = string_table[idx]
+
+        if t == T_NONE:
+            if merge_duplicate_keys and key in stack[-1]:
+                _m = stack[-1][key]
+            else:
+                _m = mapper()
+                stack[-1][key] = _m
+            stack.append(_m)
+        elif t == T_STRING:
+            stack[-1][key], pos = read_string(pos)
+        elif t == T_WIDESTRING:
+            stack[-1][key], pos = read_string(pos, wide=True)
+        elif t in (T_INT32, T_POINTER, T_COLOR):
+            val = int32.unpack_from(buf, pos)[0]
+            pos += int32.size
+
+            if t == T_POINTER:
+                val = POINTER(val)
+            elif t == T_COLOR:
+                val = COLOR(val)
+
+            stack[-1][key] = val
+        elif t == T_UINT64:
+            stack[-1][key] = UINT_64(uint64.unpack_from(buf, pos)[0])
+            pos += uint64.size
+        elif t == T_INT64:
+            stack[-1][key] = INT_64(int64.unpack_from(buf, pos)[0])
+            pos += int64.size
+        elif t == T_FLOAT32:
+            stack[-1][key] = float32.unpack_from(buf, pos)[0]
+            pos += float32.size
+        else:
+            raise SyntaxError("Unknown data type at offset %d: %s" % (pos - 1, repr(bytes([t]))))
+
+    if len(stack) != 1:
+        raise SyntaxError("Reached EOF, but Binary VDF is incomplete")
+
+    return stack.pop(), pos
+
+EVENT_ENTER = 'enter'
+EVENT_LEAVE = 'leave'
+EVENT_VALUE = 'value'
+
+SELECT_ALL = 2
+
+def binary_events(buf, offset=0, alt_format=False, string_table=None, select=None):
+    """
+    Stream binary VDF from ``buf`` starting at ``offset`` as a sequence of events instead of
+    building the whole object tree.
+
+    Yields tuples of ``(event, key, value)``:
+
+    * ``(EVENT_ENTER, key, None)`` when a nested section starts
+    * ``(EVENT_LEAVE, None, None)`` when a nested section ends
+    * ``(EVENT_VALUE, key, value)`` for every other key
+
+    ``select`` is an optional callable that receives the key path (a tuple of keys) of every
+    key before its value gets decoded. If it returns ``False`` the value - or the entire section -
+    is skipped without decoding it and without generating events for it. If it returns
+    ``SELECT_ALL`` for a section, everything inside that section is included without
+    calling ``select`` again.
+
+    The return value of the generator (``StopIteration.value``) is the offset right behind the
+    binary VDF.
+
+    ``buf``, ``alt_format`` and ``string_table`` work the same as for :func:`binary_load_buffer`.
+    """
+    int32 = struct.Struct('<i')
+    uint64 = struct.Struct('<Q')
+    int64 = struct.Struct('<q')
+    float32 = struct.Struct('<f')
+    uint32 = struct.Struct('<I')
+
+    CURRENT_BIN_END = ord(BIN_END if not alt_format else BIN_END_ALT)
+    T_NONE, T_STRING, T_INT32, T_FLOAT32, T_POINTER, T_WIDESTRING, T_COLOR, T_UINT64, T_INT64 = (
+        ord(t) for t in (BIN_NONE, BIN_STRING, BIN_INT32, BIN_FLOAT32, BIN_POINTER,
+                         BIN_WIDESTRING, BIN_COLOR, BIN_UINT64, BIN_INT64))
+    FIXED_SIZES = {
+        T_INT32: int32.size,
+        T_POINTER: int32.size,
+        T_COLOR: int32.size,
+        T_FLOAT32: float32.size,
+        T_UINT64: uint64.size,
+        T_INT64: int64.size,
+    }
+
+    def string_end(pos, wide=False):
+        end = buf.find(b'\x00\x00' if wide else b'\x00', pos)
+
+        if end == -1:
+            raise SyntaxError("Unterminated cstring (offset: %d)" % pos)
+
+        if wide:
+            end += (end - pos) % 2
+
+        return end
+
+    def read_string(pos, wide=False):
+        end = string_end(pos, wide)
+        if wide:
+            return buf[pos:end].decode('utf-16'), end + 2
+        return buf[pos:end].decode('utf-8', 'replace'), end + 1
+
+    def skip_key(pos):
+        if string_table is None:
+            return string_end(pos) + 1
+        return pos + 4
+
+    def skip_value(t, pos):
+        if t == T_STRING:
+            return string_end(pos) + 1
+        if t == T_WIDESTRING:
+            return string_end(pos, wide=True) + 2
+        try:
+            return pos + FIXED_SIZES[t]
+        except KeyError:
+            raise SyntaxError("Unknown data type at offset %d: %s" % (pos - 1, repr(bytes([t]))))
+
+    def skip_section(pos):
+        depth = 1
+        while depth > 0:
+            if pos >= size:
+                raise SyntaxError("Reached EOF, but Binary VDF is incomplete")
+            t = buf[pos]
+            pos += 1
+            if t == CURRENT_BIN_END:
+                depth -= 1
+                continue
+            pos = skip_key(pos)
+            if t == T_NONE:
+                depth += 1
+            else:
+                pos = skip_value(t, pos)
+        return pos
+
+    path = []
+    # depth of the outermost section that was selected completely, if any
+    select_all_depth = None
+    pos = offset
+    size = len(buf)
+
+    while pos < size:
+        t = buf[pos]
+        pos += 1
+
+        if t == CURRENT_BIN_END:
+            if len(path) > 0:
+                path.pop()
+                if select_all_depth is not None and len(path) < select_all_depth:
+                    select_all_depth = None
+                yield (EVENT_LEAVE, None, None)
+                continue
+            break
+
+        if string_table is None:
+            key, pos = read_string(pos)
+        else:
+            idx = uint32.unpack_from(buf, pos)[0]
+            pos += 4
+            if idx > len(string_table):
+                raise Exception(f"idx out of range: {idx} / {len(string_table)}")
+            key = string_table[idx]
+
+        if select is not None and select_all_depth is None:
+            selected = select(tuple(path) + (key,))
+            if not selected:
+                if t == T_NONE:
+                    pos = skip_section(pos)
+                else:
+                    pos = skip_value(t, pos)
+                continue
+            if selected == SELECT_ALL and t == T_NONE:
+                select_all_depth = len(path) + 1
+
+        if t == T_NONE:
+            path.append(key)
+            yield (EVENT_ENTER, key, None)
+            continue
+
+        if t == T_STRING:
+            val, pos = read_string(pos)
+        elif t == T_WIDESTRING:
+            val, pos = read_string(pos, wide=True)
+        elif t in (T_INT32, T_POINTER, T_COLOR):
+            val = int32.unpack_from(buf, pos)[0]
+            pos += int32.size
+
+            if t == T_POINTER:
+                val = POINTER(val)
+            elif t == T_COLOR:
+                val = COLOR(val)
+        elif t == T_UINT64:
+            val = UINT_64(uint64.unpack_from(buf, pos)[0])
+            pos += uint64.size
+        elif t == T_INT64:
+            val = INT_64(int64.unpack_from(buf, pos)[0])
+            pos += int64.size
+        elif t == T_FLOAT32:
+            val = float32.unpack_from(buf, pos)[0]
+            pos += float32.size
+        else:
+            raise SyntaxError("Unknown data type at offset %d: %s" % (pos - 1, repr(bytes([t]))))
+
+        yield (EVENT_VALUE, key, val)
+
+    if len(path) != 0:
+        raise SyntaxError("Reached EOF, but Binary VDF is incomplete")
+
+    return pos
+
+def binary_load_paths(buf, paths, offset=0, mapper=dict, merge_duplicate_keys=True, alt_format=False, string_table=None):
+    """
+    Deserialize only the parts of the binary VDF in ``buf`` (starting at ``offset``) that are
+    on one of the key ``paths``, everything else is skipped without being decoded.
+
+    ``paths`` is a list of key paths, each either a tuple of keys or a ``/``-separated string,
+    e.g. ``"appinfo/config/launch"``. If a path points to a section, that section is decoded
+    completely. The sections leading up to the selected keys are included in the result so
+    it has the same structure as the output of :func:`binary_load_buffer`, just with
+    everything else left out.
+
+    Returns a tuple of the deserialized object and the offset right behind the binary VDF.
+
+    The other parameters work the same as for :func:`binary_load_buffer`.
+    """
+    if not issubclass(mapper, Mapping):
+        raise TypeError("Expected mapper to be subclass of dict, got %s" % type(mapper))
+
+    paths = [tuple(p.split('/')) if isinstance(p, string_type) else tuple(p) for p in paths]
+
+    def select(key_path):
+        result = False
+        for p in paths:
+            if len(key_path) >= len(p):
+                if key_path[:len(p)] == p:
+                    return SELECT_ALL
+            elif key_path == p[:len(key_path)]:
+                result = True
+        return result
+
+    stack = [mapper()]
+    events = binary_events(buf, offset, alt_format, string_table, select)
+
+    while True:
+        try:
+            event, key, value = next(events)
+        except StopIteration as stop:
+            return stack.pop(), stop.value
+
+        if event == EVENT_ENTER:
+            if merge_duplicate_keys and key in stack[-1]:
+                _m = stack[-1][key]
+            else:
+                _m = mapper()
+                stack[-1][key] = _m
+            stack.append(_m)
+        elif event == EVENT_LEAVE:
+            stack.pop()
+        else:
+            stack[-1][key] = value
+
 def binary_dumps(obj, alt_format=False):
     """
     Serialize ``obj`` to a binary VDF formatted ``bytes``.
@@ -510,70 +840,232 @@ def vbkv_dumps(obj):
 uint32 = struct.Struct('<I')
 uint64 = struct.Struct('<Q')
 
-def parse_appinfo(fp: BufferedReader):
-    """Parse appinfo.vdf from the Steam appcache folder
+# appid, size
+appinfo_record_id = struct.Struct('<II')
+# info_state, last_updated, access_token, sha1, change_number
+appinfo_record_header = struct.Struct('<IIQ20sI')
 
-    :param fp: file-like object
-    :raises: SyntaxError
-    :rtype: (:class:`dict`, :class:`Generator`)
-    :return: (header, apps iterator)
+class StringTable:
+    """
+    Lazy string table as used by appinfo.vdf starting with b")DV\x07".
+
+    Entries are null terminated utf-8 strings stored back to back in ``buf``, starting at ``offset``.
+    Instead of decoding the whole table up front, this only indexes the table as far as needed
+    and decodes (and memoizes) the individual strings when they are looked up.
+    """
+    def __init__(self, buf, offset, count):
+        self.__buf = buf
+        self.__count = count
+        # start offsets of all entries indexed so far, plus the offset behind the last of them
+        self.__offsets = [offset]
+        self.__strings = {}
+
+    def __len__(self):
+        return self.__count
+
+    def __getitem__(self, idx):
+        try:
+            return self.__strings[idx]
+        except KeyError:
+            pass
+
+        if idx < 0 or idx >= self.__count:
+            raise IndexError("string table index out of range: %d / %d" % (idx, self.__count))
+
+        offsets = self.__offsets
+        while len(offsets) <= idx + 1:
+            end = self.__buf.find(b'\x00', offsets[-1])
+            if end == -1:
+                raise SyntaxError("Unterminated string in string table (offset: %d)" % offsets[-1])
+            offsets.append(end + 1)
+
+        result = self.__buf[offsets[idx]:offsets[idx + 1] - 1].decode('utf-8')
+        self.__strings[idx] = result
+        return result
+
+def map_file(fp):
+    """
+    Returns a read-only memory map of the file behind ``fp`` or, if the file can't
+    be mapped, its content as ``bytes``
     """
+    try:
+        return mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+    except (AttributeError, OSError, ValueError, io.UnsupportedOperation):
+        fp.seek(0)
+        return fp.read()
+
+def close_map(buf):
+    """
+    Release a buffer returned by :func:`map_file`. On Windows a file can't be replaced as long
+    as a mapping of it is open
+    """
+    if isinstance(buf, mmap.mmap):
+        buf.close()
+
+@contextmanager
+def mapped_file(fp):
+    """
+    Context manager around :func:`map_file` that closes the mapping when done
+    """
+    buf = map_file(fp)
+    try:
+        yield buf
+    finally:
+        close_map(buf)
 
-    magic = fp.read(4)
+def _parse_appinfo_header(buf):
+    magic = buf[0:4]
     if magic not in (b"'DV\x07", b"(DV\x07", b")DV\x07"):
         raise SyntaxError("Invalid magic, got %s" % repr(magic))
 
-    universe:int = uint32.unpack(fp.read(4))[0]
+    universe:int = uint32.unpack_from(buf, 4)[0]
+    offset = 8
 
     string_table = None
+    string_table_offset = None
 
     if magic == b")DV\x07":
-        string_table_offset = uint64.unpack(fp.read(8))[0]
-        string_table = []
+        string_table_offset = uint64.unpack_from(buf, offset)[0]
+        offset += uint64.size
 
-        offset = fp.tell()
-        fp.seek(0, io.SEEK_END)
-        total_size = fp.tell()
-        fp.seek(string_table_offset)
-        item_count = uint32.unpack(fp.read(4))[0]
-        # assuming the string table goes to the end of the file
-        string_table_raw = fp.read(total_size - (string_table_offset + 4))
-        split = string_table_raw.split(b'\x00')[0:item_count]
-        string_table = [b.decode('utf-8') for b in split]
-        fp.seek(offset)
+        item_count = uint32.unpack_from(buf, string_table_offset)[0]
+        string_table = StringTable(buf, string_table_offset + 4, item_count)
+
+    return ({
+              'magic': magic,
+              'universe': universe,
+              'string_table': string_table_offset,
+            },
+            string_table,
+            offset
+            )
+
+def _parse_appinfo_record(buf, pos, magic, string_table, paths, decode=None):
+    appid, size = appinfo_record_id.unpack_from(buf, pos)
+    pos += appinfo_record_id.size
+    record_end = pos + size
+
+    info_state, last_updated, access_token, sha1, change_number = appinfo_record_header.unpack_from(buf, pos)
+    pos += appinfo_record_header.size
+
+    app = {
+        'appid': appid,
+        'size': size,
+        'info_state': info_state,
+        'last_updated': last_updated,
+        'access_token': access_token,
+        'sha1': sha1,
+        'change_number': change_number,
+    }
+
+    if magic in (b"(DV\x07", b")DV\x07"):
+        app['binary_data_hash'] = buf[pos:pos + 20]
+        pos += 20
+
+    if decode is not None and not decode(app):
+        return app, record_end
+
+    if paths is None:
+        app['data'], _ = binary_load_buffer(buf, pos, string_table=string_table)
+    else:
+        app['data'], _ = binary_load_paths(buf, paths, pos, string_table=string_table)
+
+    return app, record_end
+
+def parse_appinfo(fp: BufferedReader, appids=None, paths=None, index=None, decode=None):
+    """Parse appinfo.vdf from the Steam appcache folder
+
+    :param fp: file-like object
+    :param appids: optional set of (integer) appids. If set, only those apps are decoded,
+                   all other records are skipped without parsing their content
+    :param paths: optional list of key paths, if set only those are decoded from each app,
+                  see :func:`binary_load_paths`
+    :param index: optional dict that gets filled with ``appid: (offset, size)`` for every record
+                  in the file, including the skipped ones, while iterating the apps.
+                  The offsets can be used with :func:`parse_appinfo_record`
+    :param decode: optional callable that receives each app (header fields only) before its
+                   data gets decoded. If it returns ``False`` the app is returned without ``data``
+    :raises: SyntaxError
+    :rtype: (:class:`dict`, :class:`Generator`)
+    :return: (header, apps iterator)
+    """
+
+    buf = map_file(fp)
+    try:
+        header, string_table, offset = _parse_appinfo_header(buf)
+    except:
+        close_map(buf)
+        raise
 
     def apps_iter():
-        while True:
-            appid = uint32.unpack(fp.read(4))[0]
+        # the mapping is closed once the iterator is exhausted (or discarded)
+        try:
+            pos = offset
+            remaining = set(appids) if appids is not None else None
 
-            if appid == 0:
-                break
+            # when building an index we have to go through all records
+            while remaining is None or len(remaining) > 0 or index is not None:
+                appid = uint32.unpack_from(buf, pos)[0]
 
-            app = {
-                'appid': appid,
-                'size': uint32.unpack(fp.read(4))[0],
-                'info_state': uint32.unpack(fp.read(4))[0],
-                'last_updated': uint32.unpack(fp.read(4))[0],
-                'access_token': uint64.unpack(fp.read(8))[0],
-                'sha1': fp.read(20),
-                'change_number': uint32.unpack(fp.read(4))[0],
-            }
+                if appid == 0:
+                    break
 
-            if magic in (b"(DV\x07", b")DV\x07"):
-                app['binary_data_hash'] = fp.read(20)
+                # size of the record following the size field
+                size = uint32.unpack_from(buf, pos + 4)[0]
+                record_end = pos + appinfo_record_id.size + size
 
-            app['data'] = binary_load(fp, string_table=string_table)
+                if index is not None:
+                    index[appid] = (pos, size)
 
-            yield app
+                if remaining is not None:
+                    if appid not in remaining:
+                        pos = record_end
+                        continue
+                    remaining.discard(appid)
 
+                app, pos = _parse_appinfo_record(buf, pos, header['magic'], string_table, paths, decode)
 
-    return ({
-              'magic': magic,
-              'universe': universe,
-              'string_table': string_table_offset,
-            },
-            apps_iter()
-            )
+                yield app
+        finally:
+            close_map(buf)
+
+
+    return (header, apps_iter())
+
+def parse_appinfo_record(fp: BufferedReader, offset, paths=None, decode=None):
+    """Parse a single app record from appinfo.vdf
+
+    :param fp: file-like object
+    :param offset: offset of the record within the file, as collected by the ``index``
+                   parameter of :func:`parse_appinfo`
+    :param paths: optional list of key paths, see :func:`parse_appinfo`
+    :param decode: optional callable to decide whether to decode the data, see :func:`parse_appinfo`
+    :raises: SyntaxError
+    :rtype: :class:`dict`
+    :return: app
+    """
+
+    with mapped_file(fp) as buf:
+        return next(parse_appinfo_records(buf, [offset], paths, decode))
+
+def parse_appinfo_records(buf, offsets, paths=None, decode=None):
+    """Parse app records at known offsets from an already mapped appinfo.vdf, so that looking up
+    several apps maps the file and parses its header (and string table) only once
+
+    :param buf: content of appinfo.vdf, see :func:`map_file` and :func:`mapped_file`
+    :param offsets: offsets of the records, as collected by the ``index`` parameter of
+                    :func:`parse_appinfo`
+    :param paths: optional list of key paths, see :func:`parse_appinfo`
+    :param decode: optional callable to decide whether to decode the data, see :func:`parse_appinfo`
+    :raises: SyntaxError
+    :rtype: :class:`Generator`
+    :return: apps, in the order of ``offsets``
+    """
+    header, string_table, _ = _parse_appinfo_header(buf)
+
+    for offset in offsets:
+        app, _ = _parse_appinfo_record(buf, offset, header['magic'], string_table, paths, decode)
+        yield app
 
 def parse_packageinfo(fp):
     """Parse packageinfo.vdf from the Steam appcache folder
@@ -595,31 +1087,42 @@ def parse_packageinfo(fp):
 #   ---- end of section ---------
 #   uint32   - EOF: 0xFFFFFFFF
 
-    magic = fp.read(4)
+    buf = map_file(fp)
+
+    magic = buf[0:4]
     if magic not in (b"'UV\x06", b"(UV\x06"):
+        close_map(buf)
         raise SyntaxError("Invalid magic, got %s" % repr(magic))
 
-    universe = uint32.unpack(fp.read(4))[0]
+    universe = uint32.unpack_from(buf, 4)[0]
 
     def pkgs_iter():
-        while True:
-            packageid = uint32.unpack(fp.read(4))[0]
-
-            if packageid == 0xFFFFFFFF:
-                break
-
-            pkg = {
-                'packageid': packageid,
-                'sha1': fp.read(20),
-                'change_number': uint32.unpack(fp.read(4))[0],
-            }
-
-            if magic == b"(UV\x06":
-                pkg['token'] = uint64.unpack(fp.read(8))[0]
-
-            pkg['data'] = binary_load(fp)
-
-            yield pkg
+        # the mapping is closed once the iterator is exhausted (or discarded)
+        try:
+            pos = 8
+            while True:
+                packageid = uint32.unpack_from(buf, pos)[0]
+                pos += 4
+
+                if packageid == 0xFFFFFFFF:
+                    break
+
+                pkg = {
+                    'packageid': packageid,
+                    'sha1': buf[pos:pos + 20],
+                    'change_number': uint32.unpack_from(buf, pos + 20)[0],
+                }
+                pos += 24
+
+                if magic == b"(UV\x06":
+                    pkg['token'] = uint64.unpack_from(buf, pos)[0]
+                    pos += uint64.size
+
+                pkg['data'], pos = binary_load_buffer(buf, pos)
+
+                yield pkg
+        finally:
+            close_map(buf)
 
 
     return ({
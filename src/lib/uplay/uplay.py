@@ -1,6 +1,6 @@
 from winreg import ConnectRegistry, EnumKey, OpenKeyEx, QueryValueEx, HKEY_LOCAL_MACHINE
 
-from ..util import RegKeyIter
+from ..util import RegKeyIter, launch, launch_record, regkey_fingerprint
 
 import os
 from urllib import parse
@@ -20,10 +20,24 @@ class UPlay:
 
         self.__games = self.__read_manifest()
 
+    @staticmethod
+    def fingerprint(context, settings):
+        return regkey_fingerprint(OpenKeyEx(HKEY_LOCAL_MACHINE, UPlay.REG_INSTALL_PATH + R"\Installs"))
+
     def run(self, kpu, target, call_args):
-        cmd = UPlay.LAUNCHER_CMD.format(appId=target)
+        launch(kpu, self.launch_record(target), call_args, self.__context)
+
+    def launch_record(self, target):
+        return launch_record(UPlay.LAUNCHER_CMD.format(appId=target))
 
-        kpu.shell_execute(cmd)
+    @property
+    def watch_paths(self):
+        # the games are read from the registry
+        return []
+
+    @property
+    def watch_extension(self):
+        return None
 
     @property
     def items(self):
@@ -0,0 +1,41 @@
+import json
+import os
+
+class CatalogSnapshot:
+    """
+    The last complete catalog, persisted in the package cache so it can be published right away
+    on the next start, before the stores have been searched again.
+    Together with the catalog we keep the launch records of all items (see launch_record) so they
+    can be started before the stores are loaded
+    """
+    FILE_NAME = "catalog.json"
+    VERSION = 2
+
+    def __init__(self, cache_path: str):
+        self.__path = os.path.join(cache_path, CatalogSnapshot.FILE_NAME)
+
+    def load(self):
+        """
+        returns the list of catalog entries and the launch records (data_bag -> launch record)
+        or None if there is no (usable) snapshot
+        """
+        try:
+            with open(self.__path, encoding="utf8") as fd:
+                snapshot = json.load(fd)
+        except (OSError, ValueError):
+            return None
+
+        if snapshot.get("version") != CatalogSnapshot.VERSION:
+            return None
+
+        return snapshot["entries"], snapshot["launches"]
+
+    def save(self, entries: list, launches: dict):
+        temp_path = self.__path + ".tmp"
+        with open(temp_path, "w", encoding="utf8") as fd:
+            json.dump({
+                "version": CatalogSnapshot.VERSION,
+                "entries": entries,
+                "launches": launches,
+            }, fd)
+        os.replace(temp_path, self.__path)
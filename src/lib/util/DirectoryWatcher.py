@@ -0,0 +1,77 @@
+import threading
+
+from .fingerprint import dir_fingerprint
+
+class DirectoryWatcher:
+    """
+    Watches groups of directories for changes and reports which groups changed.
+
+    This works by polling: at a fixed interval a snapshot of every directory (names, modification
+    times and sizes of the entries) is taken and compared to the previous one, so it works
+    everywhere, including network drives.
+    """
+    def __init__(self, callback, interval: float):
+        """
+        Arguments:
+            callback {[callable]} -- called with the list of keys of the groups that changed
+            interval {[float]} -- polling interval in seconds
+        """
+        self.__callback = callback
+        self.__interval = interval
+        self.__lock = threading.Lock()
+        # key -> (extension, {path: snapshot})
+        self.__watched = {}
+        self.__stop = threading.Event()
+        self.__thread = None
+
+    def watch(self, key: str, paths: list, extension: str = None):
+        """
+        set the directories watched for key, replacing the ones watched before.
+        If extension is set, only files with that extension are taken into account.
+        The current state of the directories is the baseline changes are reported against
+        """
+        snapshots = {path: dir_fingerprint(path, extension) for path in paths}
+        with self.__lock:
+            self.__watched[key] = (extension, snapshots)
+
+    def unwatch(self, key: str):
+        with self.__lock:
+            self.__watched.pop(key, None)
+
+    def poll(self):
+        """
+        check all watched directories once, returns the keys of the groups that changed
+        """
+        with self.__lock:
+            watched = dict(self.__watched)
+
+        changed = []
+        for key, (extension, snapshots) in watched.items():
+            current = {path: dir_fingerprint(path, extension) for path in snapshots.keys()}
+            if current != snapshots:
+                changed.append(key)
+                with self.__lock:
+                    # only update if the group wasn't re-registered in the meantime
+                    if self.__watched.get(key) is watched[key]:
+                        self.__watched[key] = (extension, current)
+        return changed
+
+    def start(self):
+        if self.__thread is not None:
+            return
+        # each polling thread gets its own event so a thread that is still finishing its last poll
+        # after stop() can't be revived by a subsequent start()
+        self.__stop = threading.Event()
+        self.__thread = threading.Thread(target=self.__run, name="AllMyGames-watcher", daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        self.__stop.set()
+        self.__thread = None
+
+    def __run(self):
+        stop = self.__stop
+        while not stop.wait(self.__interval):
+            changed = self.poll()
+            if len(changed) > 0:
+                self.__callback(changed)
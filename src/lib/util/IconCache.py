@@ -0,0 +1,246 @@
+import json
+import os
+import re
+import threading
+import time
+from hashlib import sha1
+
+class IconCache:
+    """
+    Index of the icons in the package cache directory. The directory is listed once per refresh
+    instead of searching it for every single catalog item.
+
+    Icons copied into the cache are stored under the hash of their content so that items with the
+    same icon (e.g. all launchers of a game) share one file. Each item's icon is looked up by the name
+    "{repo}_{target}" (the stem), which is an alias of the content file. Files named after the stem
+    directly (from older versions or written by the stores themselves) are supported as well.
+
+    The cache also records when each icon was last stored so that icons no longer needed can be
+    removed and the size of the cache can be limited (see collect)
+    """
+    # icons can be any file (e.g. an exe the icon is extracted from), so every file in the cache
+    # directory is considered an icon except for the state files of the plugin and the temporary
+    # files written while saving
+    METADATA_EXTENSIONS = set([".json", ".tmp"])
+    FILE_NAME = "icon_cache.json"
+    # written by earlier versions, removed on load
+    OBSOLETE_FILE_NAMES = ["icon_usage.json"]
+    VERSION = 1
+    CONTENT_NAME = re.compile(r"^[0-9a-f]{40}$")
+
+    def __init__(self, cache_path: str, package_full_name: str):
+        self.__cache_path = cache_path
+        self.__package_full_name = package_full_name
+        self.__lock = threading.Lock()
+        # stem -> file name of all icons in the directory
+        self.__files = {}
+        # persisted state: stem -> content file and file name -> time the icon was last stored
+        self.__aliases = None
+        self.__used = None
+        # (source path, mtime, size) -> content file, so the same source isn't read and hashed again
+        self.__sources = {}
+
+    @property
+    def path(self):
+        return self.__cache_path
+
+    def refresh(self):
+        """
+        list the cache directory again, e.g. in case files were removed behind our back
+        """
+        files = {}
+        try:
+            with os.scandir(self.__cache_path) as entries:
+                for entry in entries:
+                    stem, ext = os.path.splitext(entry.name)
+                    if ext.lower() not in IconCache.METADATA_EXTENSIONS and entry.is_file():
+                        files[stem] = entry.name
+        except FileNotFoundError:
+            pass
+
+        aliases, used = self.__aliases, self.__used
+        if aliases is None:
+            aliases, used = self.__load()
+
+        with self.__lock:
+            self.__files = files
+            self.__aliases = aliases
+            self.__used = used
+
+    def lookup(self, stem: str):
+        """
+        returns the name of the cached icon file for stem or None if there is none
+        """
+        with self.__lock:
+            file_name = self.__files.get(stem)
+            if file_name is None:
+                file_name = (self.__aliases or {}).get(stem)
+                if file_name is not None and os.path.splitext(file_name)[0] not in self.__files:
+                    file_name = None
+            return file_name
+
+    def add(self, file_name: str):
+        """
+        register an icon file that was written to the cache directory
+        """
+        with self.__lock:
+            self.__files[os.path.splitext(file_name)[0]] = file_name
+            self.__touch(file_name)
+
+    def store(self, stem: str, source_path: str):
+        """
+        copy the icon file at source_path into the cache as the icon for stem. Sources that are
+        already in the cache (same path or same content) aren't copied again.
+        Returns the name of the file in the cache
+        """
+        stat = os.stat(source_path)
+        source = (os.path.normcase(os.path.abspath(source_path)), stat.st_mtime_ns, stat.st_size)
+        with self.__lock:
+            file_name = self.__sources.get(source)
+            if file_name is not None and os.path.splitext(file_name)[0] not in self.__files:
+                file_name = None
+
+        if file_name is None:
+            with open(source_path, "rb") as fd:
+                content = fd.read()
+            digest = sha1(content).hexdigest()
+            file_name = digest + os.path.splitext(source_path)[1].lower()
+            with self.__lock:
+                exists = self.__files.get(digest) == file_name
+            if not exists:
+                path = os.path.join(self.__cache_path, file_name)
+                with open(path + ".tmp", "wb") as fd:
+                    fd.write(content)
+                os.replace(path + ".tmp", path)
+
+        with self.__lock:
+            self.__sources[source] = file_name
+            self.__files[os.path.splitext(file_name)[0]] = file_name
+            if self.__aliases is None:
+                self.__aliases = {}
+            self.__aliases[stem] = file_name
+            self.__touch(file_name)
+        return file_name
+
+    def url(self, file_name: str):
+        return "cache://{}/{}".format(self.__package_full_name, file_name)
+
+    def file_name(self, url: str):
+        """
+        the name of the file in the cache an icon url refers to, None if it isn't in the cache
+        """
+        prefix = self.url("")
+        if url is None or not url.startswith(prefix):
+            return None
+        return url[len(prefix):]
+
+    def collect(self, referenced: set, owners: list, max_size: int, in_use: set = None):
+        """
+        remove icons that are no longer needed:
+        icons of the owners (the stores the catalog was built from) whose stem isn't referenced
+        any more get deleted, as well as content files no item refers to.
+        Then, if the cache is larger than max_size bytes (0 means no limit), the icons stored the
+        longest time ago are deleted until it fits. Icons of referenced stems and the files in in_use
+        are never deleted, so this only affects icons of stores that aren't part of the catalog and
+        the cache may stay larger than max_size if the catalog needs all of them.
+        Returns the set of file names removed
+        """
+        with self.__lock:
+            files = dict(self.__files)
+            aliases = dict(self.__aliases or {})
+            used = dict(self.__used or {})
+
+        prefixes = tuple(owner + "_" for owner in owners)
+        is_unused = lambda stem: stem.startswith(prefixes) and stem not in referenced
+        aliased = set(file_name for stem, file_name in aliases.items() if not is_unused(stem))
+
+        keep = set(in_use or [])
+        for stem in referenced:
+            file_name = files.get(stem) or aliases.get(stem)
+            if file_name is not None:
+                keep.add(file_name)
+
+        remove = set()
+        for stem, file_name in files.items():
+            if file_name in keep:
+                continue
+            if IconCache.CONTENT_NAME.match(stem) is not None:
+                if file_name not in aliased:
+                    remove.add(file_name)
+            elif is_unused(stem):
+                remove.add(file_name)
+
+        if max_size > 0:
+            sizes = {}
+            for file_name in files.values():
+                if file_name not in remove:
+                    try:
+                        sizes[file_name] = os.path.getsize(os.path.join(self.__cache_path, file_name))
+                    except OSError:
+                        if file_name not in keep:
+                            remove.add(file_name)
+            total = sum(sizes.values())
+            # icons that were never recorded as stored are the first to go
+            evictable = [file_name for file_name in sizes.keys() if file_name not in keep]
+            for file_name in sorted(evictable, key=lambda file_name: used.get(file_name, 0)):
+                if total <= max_size:
+                    break
+                remove.add(file_name)
+                total -= sizes[file_name]
+
+        removed = set()
+        for file_name in remove:
+            try:
+                os.remove(os.path.join(self.__cache_path, file_name))
+                removed.add(file_name)
+            except FileNotFoundError:
+                removed.add(file_name)
+            except OSError:
+                # probably in use, try again next time
+                continue
+            with self.__lock:
+                self.__files.pop(os.path.splitext(file_name)[0], None)
+
+        with self.__lock:
+            existing = set(self.__files.values())
+            self.__aliases = {stem: file_name for stem, file_name in (self.__aliases or {}).items()
+                              if file_name in existing and not is_unused(stem)}
+            self.__used = {file_name: stamp for file_name, stamp in (self.__used or {}).items()
+                           if file_name in existing}
+            aliases, used = dict(self.__aliases), dict(self.__used)
+        self.__save(aliases, used)
+
+        return removed
+
+    def __touch(self, file_name: str):
+        if self.__used is None:
+            self.__used = {}
+        self.__used[file_name] = time.time()
+
+    def __load(self):
+        for file_name in IconCache.OBSOLETE_FILE_NAMES:
+            try:
+                os.remove(os.path.join(self.__cache_path, file_name))
+            except OSError:
+                pass
+
+        try:
+            with open(os.path.join(self.__cache_path, IconCache.FILE_NAME), encoding="utf8") as fd:
+                cached = json.load(fd)
+        except (OSError, ValueError):
+            return {}, {}
+
+        if cached.get("version") != IconCache.VERSION:
+            return {}, {}
+
+        return cached["aliases"], cached["used"]
+
+    def __save(self, aliases: dict, used: dict):
+        path = os.path.join(self.__cache_path, IconCache.FILE_NAME)
+        with open(path + ".tmp", "w", encoding="utf8") as fd:
+            json.dump({
+                "version": IconCache.VERSION,
+                "aliases": aliases,
+                "used": used,
+            }, fd)
+        os.replace(path + ".tmp", path)
@@ -0,0 +1,35 @@
+import os
+import threading
+
+class ManifestCache:
+    """
+    Cache of parsed manifest files, a manifest is only parsed again if its modification
+    time or size changed. Stores keep one at class level so it survives between scans
+    """
+    def __init__(self):
+        self.__lock = threading.Lock()
+        # path -> (mtime, size, parsed manifest)
+        self.__manifests = {}
+
+    def get(self, path: str, parse):
+        """
+        get the parsed manifest at path, calling parse(path) if it isn't cached or changed
+        """
+        stat = os.stat(path)
+        with self.__lock:
+            cached = self.__manifests.get(path)
+        if cached is not None and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            return cached[2]
+
+        manifest = parse(path)
+        with self.__lock:
+            self.__manifests[path] = (stat.st_mtime_ns, stat.st_size, manifest)
+        return manifest
+
+    def retain(self, paths: list):
+        """
+        drop all manifests except the ones at paths, e.g. those of games that got uninstalled
+        """
+        paths = set(paths)
+        with self.__lock:
+            self.__manifests = {path: cached for path, cached in self.__manifests.items() if path in paths}
@@ -0,0 +1,95 @@
+import ctypes
+import subprocess
+import threading
+import time
+
+def tasklist_processes():
+    """
+    image names of all running processes, determined by running tasklist.exe
+    """
+    startupinfo = subprocess.STARTUPINFO()
+    startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+    output, err = subprocess.Popen(["tasklist.exe", "/FO", "CSV", "/NH"],
+                                    stdout=subprocess.PIPE,
+                                    startupinfo=startupinfo).communicate()
+    lines = output.decode("utf-8", errors="replace").splitlines()
+    return set(line.split('","', 1)[0].strip('"').lower() for line in lines if line != "")
+
+def toolhelp_processes():
+    """
+    image names of all running processes, determined through the toolhelp api without starting
+    a separate process
+    """
+    from ctypes import wintypes
+
+    class PROCESSENTRY32W(ctypes.Structure):
+        _fields_ = [
+            ("dwSize", wintypes.DWORD),
+            ("cntUsage", wintypes.DWORD),
+            ("th32ProcessID", wintypes.DWORD),
+            ("th32DefaultHeapID", ctypes.c_size_t),
+            ("th32ModuleID", wintypes.DWORD),
+            ("cntThreads", wintypes.DWORD),
+            ("th32ParentProcessID", wintypes.DWORD),
+            ("pcPriClassBase", ctypes.c_long),
+            ("dwFlags", wintypes.DWORD),
+            ("szExeFile", ctypes.c_wchar * 260),
+        ]
+
+    TH32CS_SNAPPROCESS = 0x2
+    kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+    kernel32.CreateToolhelp32Snapshot.restype = wintypes.HANDLE
+    kernel32.CreateToolhelp32Snapshot.argtypes = [wintypes.DWORD, wintypes.DWORD]
+    kernel32.Process32FirstW.argtypes = [wintypes.HANDLE, ctypes.POINTER(PROCESSENTRY32W)]
+    kernel32.Process32NextW.argtypes = [wintypes.HANDLE, ctypes.POINTER(PROCESSENTRY32W)]
+    kernel32.CloseHandle.argtypes = [wintypes.HANDLE]
+
+    snapshot = kernel32.CreateToolhelp32Snapshot(TH32CS_SNAPPROCESS, 0)
+    if snapshot is None or snapshot == wintypes.HANDLE(-1).value:
+        raise ctypes.WinError(ctypes.get_last_error())
+
+    result = set()
+    try:
+        entry = PROCESSENTRY32W()
+        entry.dwSize = ctypes.sizeof(PROCESSENTRY32W)
+        more = kernel32.Process32FirstW(snapshot, ctypes.byref(entry))
+        while more:
+            result.add(entry.szExeFile.lower())
+            more = kernel32.Process32NextW(snapshot, ctypes.byref(entry))
+    finally:
+        kernel32.CloseHandle(snapshot)
+    return result
+
+def default_processes():
+    try:
+        return toolhelp_processes()
+    except (AttributeError, OSError):
+        # ctypes.WinDLL doesn't exist outside of windows
+        return tasklist_processes()
+
+class ProcessProbe:
+    """
+    Determines whether programs are running. The list of processes is cached for a short time
+    since getting it is comparatively expensive and launches tend to come in bursts.
+    """
+    def __init__(self, list_processes=None, max_age: float = 2.0):
+        """
+        Arguments:
+            list_processes {[callable]} -- returns the set of (lower case) image names of all
+                                           running processes, defaults to default_processes
+            max_age {[float]} -- how long (in seconds) the list of processes is reused
+        """
+        self.__list_processes = list_processes or default_processes
+        self.__max_age = max_age
+        self.__lock = threading.Lock()
+        self.__processes = None
+        self.__updated = 0
+
+    def is_running(self, image_name: str, max_age: float = None):
+        if max_age is None:
+            max_age = self.__max_age
+        with self.__lock:
+            if self.__processes is None or time.monotonic() - self.__updated > max_age:
+                self.__processes = self.__list_processes()
+                self.__updated = time.monotonic()
+            return image_name.lower() in self.__processes
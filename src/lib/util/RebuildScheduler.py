@@ -0,0 +1,63 @@
+import threading
+import time
+
+class RebuildScheduler:
+    """
+    Runs rebuilds on a single background thread. Triggers are collected until none came in for
+    the quiet period, then a single rebuild is run for all of them. Triggers that come in while a
+    rebuild is running cause exactly one more rebuild once it's done, so rebuilds never overlap.
+    """
+    def __init__(self, rebuild, delay: float, name: str):
+        """
+        Arguments:
+            rebuild {[callable]} -- called with the set of keys to rebuild or None to rebuild everything
+            delay {[float]} -- quiet period in seconds
+            name {[str]} -- name of the worker thread
+        """
+        self.__rebuild = rebuild
+        self.__delay = delay
+        self.__name = name
+        self.__condition = threading.Condition()
+        self.__pending = False
+        self.__keys = set()
+        self.__last_trigger = 0
+        self.__thread = None
+
+    def trigger(self, keys: list = None):
+        """
+        request a rebuild of the specified keys, None means everything
+        """
+        with self.__condition:
+            if not self.__pending:
+                self.__keys = set()
+            self.__pending = True
+            if keys is None or self.__keys is None:
+                self.__keys = None
+            else:
+                self.__keys.update(keys)
+            self.__last_trigger = time.monotonic()
+
+            if self.__thread is None:
+                self.__thread = threading.Thread(target=self.__run, name=self.__name, daemon=True)
+                self.__thread.start()
+            self.__condition.notify()
+
+    def __run(self):
+        while True:
+            with self.__condition:
+                while True:
+                    if not self.__pending:
+                        self.__condition.wait()
+                        continue
+                    remaining = self.__last_trigger + self.__delay - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.__condition.wait(remaining)
+                keys = self.__keys
+                self.__pending = False
+
+            try:
+                self.__rebuild(keys)
+            except Exception:
+                # the rebuild is expected to do its own error reporting, the worker has to survive
+                pass
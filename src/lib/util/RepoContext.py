@@ -23,7 +23,17 @@ class RepoContext:
     def err(self, msg: str, *args):
         return self.__plugin.err("[{id}] {msg}".format(id=self.__id, msg=msg), *args)
 
+    def request_update(self):
+        """
+        ask for the repository to be scanned again, e.g. because data it depends on was updated
+        in the background
+        """
+        return self.__plugin.request_update([self.__id])
+
     @property
     def plugin(self):
         return self.__plugin
 
+    @property
+    def cache_path(self):
+        return self.__plugin.get_package_cache_path(create=True)
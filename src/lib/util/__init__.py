@@ -1,3 +1,12 @@
+from .CatalogSnapshot import CatalogSnapshot
 from .CILookup import CILookup
+from .DirectoryWatcher import DirectoryWatcher
+from .IconCache import IconCache
+from .ManifestCache import ManifestCache
+from .ProcessProbe import ProcessProbe
+from .RebuildScheduler import RebuildScheduler
 from .RegKeyIter import RegKeyIter
 from .RepoContext import RepoContext
+from .fingerprint import dir_fingerprint, file_fingerprint
+from .launcher import launch, launch_record
+from .regfingerprint import regkey_fingerprint
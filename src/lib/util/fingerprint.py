@@ -0,0 +1,28 @@
+import os
+
+def file_fingerprint(path: str):
+    """
+    fingerprint of a single file (or directory), None if it doesn't exist
+    """
+    try:
+        stat = os.stat(path)
+        return [stat.st_mtime_ns, stat.st_size]
+    except OSError:
+        return None
+
+def dir_fingerprint(path: str, extension: str = None):
+    """
+    fingerprint of the content of a directory, consisting of the names, modification times and sizes
+    of all entries. If extension is set, only files with that extension are taken into account.
+    Returns None if the directory doesn't exist
+    """
+    try:
+        with os.scandir(path) as entries:
+            result = []
+            for entry in entries:
+                if extension is None or os.path.splitext(entry.name)[1] == extension:
+                    stat = entry.stat()
+                    result.append([entry.name, stat.st_mtime_ns, stat.st_size])
+            return sorted(result)
+    except OSError:
+        return None
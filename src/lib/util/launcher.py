@@ -0,0 +1,83 @@
+import os
+import time
+from winreg import OpenKeyEx, QueryValueEx, HKEY_CURRENT_USER
+
+from .ProcessProbe import ProcessProbe
+
+# how long to wait (in seconds) for a required program to start before launching anyway
+REQUIRES_TIMEOUT = 30
+
+# shared so all launches benefit from the cached process list
+PROCESSES = ProcessProbe()
+
+def launch_record(file: str, args: str = "", working_dir: str = "", env: dict = None, requires: dict = None,
+                  call_args: bool = False):
+    """
+    everything needed to start a catalog item, in a form that can be serialized so items can be
+    launched without the store that produced them being loaded.
+
+    Arguments:
+        file {[str]} -- the executable or url to run
+        args {[str]} -- command line arguments
+        working_dir {[str]} -- working directory
+        env {[dict]} -- environment variables to set before starting
+        requires {[dict]} -- a program that has to be running first: {"process": image name,
+                             "file": executable to start it with, "ready": optional readiness
+                             signal, see is_ready}
+        call_args {[bool]} -- whether the arguments entered by the user are passed on
+    """
+    return {
+        "file": file,
+        "args": args,
+        "working_dir": working_dir,
+        "env": env or {},
+        "requires": requires,
+        "call_args": call_args,
+    }
+
+def is_ready(requires: dict, probe: ProcessProbe, max_age: float = None):
+    """
+    whether a required program is running and done starting up. The process existing doesn't
+    mean it's ready yet, so if the requirement has a "ready" signal ({"key": registry key under
+    HKEY_CURRENT_USER, "values": [names]}), all those values also have to be set and non-zero
+    """
+    if not probe.is_running(requires["process"], max_age):
+        return False
+
+    ready = requires.get("ready")
+    if ready is None:
+        return True
+    try:
+        key = OpenKeyEx(HKEY_CURRENT_USER, ready["key"])
+        return all(QueryValueEx(key, value)[0] for value in ready["values"])
+    except OSError:
+        return False
+
+def launch(kpu, record: dict, call_args: str, context=None, probe: ProcessProbe = None):
+    """
+    start a launch record (see launch_record). This may block while waiting for a required
+    program to start up
+    """
+    os.environ.update(record["env"])
+
+    requires = record["requires"]
+    if requires is not None:
+        probe = probe or PROCESSES
+        if not is_ready(requires, probe):
+            if not probe.is_running(requires["process"]):
+                if context is not None:
+                    context.dbg("{} not running, starting it now".format(requires["process"]))
+                kpu.shell_execute(requires["file"])
+
+            deadline = time.monotonic() + REQUIRES_TIMEOUT
+            while not is_ready(requires, probe, max_age=0):
+                if time.monotonic() >= deadline:
+                    if context is not None:
+                        context.warn("{} didn't start in time, launching anyway".format(requires["process"]))
+                    break
+                time.sleep(0.25)
+
+    args = record["args"]
+    if record["call_args"]:
+        args += " " + call_args
+    kpu.shell_execute(record["file"], args=args, working_dir=record["working_dir"])
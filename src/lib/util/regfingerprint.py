@@ -0,0 +1,8 @@
+from winreg import QueryInfoKey
+
+def regkey_fingerprint(key):
+    """
+    fingerprint of an open registry key, consisting of the number of sub keys and values and the
+    time of the last modification
+    """
+    return list(QueryInfoKey(key))
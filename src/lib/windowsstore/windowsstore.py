@@ -1,6 +1,6 @@
 from winreg import ConnectRegistry, EnumKey, OpenKeyEx, QueryValueEx, HKEY_CLASSES_ROOT
 
-from ..util import RegKeyIter
+from ..util import RegKeyIter, launch, launch_record, regkey_fingerprint
 
 import os
 from xml.dom import minidom
@@ -26,7 +26,15 @@ class WindowsStore:
         self.__valid = False
         self.__games = self.__read_repository()
 
+    @staticmethod
+    def fingerprint(context, settings):
+        root = ConnectRegistry(None, HKEY_CLASSES_ROOT)
+        return regkey_fingerprint(OpenKeyEx(root, WindowsStore.REPOSITORY_PATH))
+
     def run(self, kpu, target, call_args):
+        launch(kpu, self.launch_record(target), call_args, self.__context)
+
+    def launch_record(self, target):
         appid, publisher, exeid = target.split('|')
         args = WindowsStore.LAUNCHER_ARGS.format(
             appid=appid,
@@ -34,7 +42,16 @@ class WindowsStore:
             exename=exeid
         )
 
-        kpu.shell_execute("explorer.exe", args=args)
+        return launch_record("explorer.exe", args=args)
+
+    @property
+    def watch_paths(self):
+        # the directories the packages are installed to
+        return sorted(set(os.path.dirname(game["root_path"]) for game in self.__games))
+
+    @property
+    def watch_extension(self):
+        return None
 
     @property
     def items(self):
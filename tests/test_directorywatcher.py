@@ -0,0 +1,94 @@
+import importlib.util
+import os
+import sys
+import tempfile
+import threading
+import unittest
+
+# the util package as a whole needs keypirinha and winreg, the watcher itself doesn't so it's
+# loaded on its own
+UTIL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "lib", "util")
+spec = importlib.util.spec_from_loader("amg_util", loader=None, is_package=True)
+amg_util = importlib.util.module_from_spec(spec)
+amg_util.__path__ = [UTIL_PATH]
+sys.modules["amg_util"] = amg_util
+
+from amg_util.DirectoryWatcher import DirectoryWatcher
+
+def write(path: str, content: str = "x"):
+    with open(path, "w") as fd:
+        fd.write(content)
+
+class DirectoryWatcherTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_unchanged(self):
+        watcher = DirectoryWatcher(lambda changed: None, 1)
+        watcher.watch("Steam", [self.path])
+        self.assertEqual(watcher.poll(), [])
+
+    def test_added_file(self):
+        watcher = DirectoryWatcher(lambda changed: None, 1)
+        watcher.watch("Steam", [self.path])
+        write(os.path.join(self.path, "appmanifest_1.acf"))
+        self.assertEqual(watcher.poll(), ["Steam"])
+        # the change is only reported once
+        self.assertEqual(watcher.poll(), [])
+
+    def test_extension_filter(self):
+        watcher = DirectoryWatcher(lambda changed: None, 1)
+        watcher.watch("Steam", [self.path], ".acf")
+        write(os.path.join(self.path, "download.tmp"))
+        self.assertEqual(watcher.poll(), [])
+        write(os.path.join(self.path, "appmanifest_1.acf"))
+        self.assertEqual(watcher.poll(), ["Steam"])
+
+    def test_only_changed_group(self):
+        other = os.path.join(self.path, "other")
+        os.mkdir(other)
+        watcher = DirectoryWatcher(lambda changed: None, 1)
+        watcher.watch("Steam", [self.path], ".acf")
+        watcher.watch("EGS", [other], ".item")
+        write(os.path.join(other, "game.item"))
+        self.assertEqual(watcher.poll(), ["EGS"])
+
+    def test_missing_directory(self):
+        missing = os.path.join(self.path, "missing")
+        watcher = DirectoryWatcher(lambda changed: None, 1)
+        watcher.watch("Origin", [missing])
+        self.assertEqual(watcher.poll(), [])
+        os.mkdir(missing)
+        self.assertEqual(watcher.poll(), ["Origin"])
+
+    def test_unwatch(self):
+        watcher = DirectoryWatcher(lambda changed: None, 1)
+        watcher.watch("Steam", [self.path])
+        watcher.unwatch("Steam")
+        write(os.path.join(self.path, "appmanifest_1.acf"))
+        self.assertEqual(watcher.poll(), [])
+
+    def test_callback(self):
+        reported = []
+        done = threading.Event()
+
+        def callback(changed):
+            reported.append(changed)
+            done.set()
+
+        watcher = DirectoryWatcher(callback, 0.05)
+        watcher.watch("Steam", [self.path])
+        watcher.start()
+        try:
+            write(os.path.join(self.path, "appmanifest_1.acf"))
+            self.assertTrue(done.wait(5))
+        finally:
+            watcher.stop()
+        self.assertEqual(reported[0], ["Steam"])
+
+if __name__ == "__main__":
+    unittest.main()